@@ -6,7 +6,10 @@ Provides Agent class interface expected by app.py
 
 import os
 import json
-from typing import List, Dict, Tuple
+import time
+import threading
+from collections import namedtuple
+from typing import List, Dict, Optional, Tuple
 from ui_components import ASSISTANT_AVATAR, USER_AVATAR
 
 # Import functions from support_agent
@@ -14,42 +17,141 @@ from support_agent import (
     load_faqs as _load_faqs,
     find_similar_faqs,
     generate_response as _generate_response,
+    local_faq_answer as _local_faq_answer,
     build_index,
-    should_escalate
+    should_escalate,
+    timed,
+    current_snapshot,
+    add_faq as _add_faq,
+    update_faq as _update_faq,
+    delete_faq as _delete_faq,
 )
+from bm25_index import BM25Index
+from row_store import RowStore
+from file_watcher import FileWatcher
+
+HOT_RELOAD_INTERVAL = float(os.environ.get("HOT_RELOAD_INTERVAL", "5"))  # seconds between file polls
 
 # Simple config class for avatars
 class Config:
     ASSISTANT_AVATAR = ASSISTANT_AVATAR
     USER_AVATAR = USER_AVATAR
 
+# Everything a query reads from the agent, swapped as one unit on reload
+AgentData = namedtuple("AgentData", ["faqs", "rows", "row_index"])
+
 class Agent:
-    def __init__(self, faqs_path="data/faqs_large.json", dataset_csv_path="data/dataset.csv"):
+    def __init__(self, faqs_path="data/faqs_large.json", dataset_csv_path="data/dataset.csv",
+                 background_index: bool = False, watch_files: bool = False,
+                 watch_interval: float = HOT_RELOAD_INTERVAL):
+        """
+        background_index=True builds the vector index in a warm-up thread so
+        the caller (e.g. the Streamlit UI) is not blocked on model loading.
+        watch_files=True polls the FAQ and dataset files and rebuilds the
+        indexes in the background when their content changes.
+        """
         self.config = Config()
         self.faqs_path = faqs_path
         self.dataset_csv_path = dataset_csv_path
+        self.reload_count = 0
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+        self._data = self._load_data()
         
+        # Build search index
+        if self.faqs:
+            try:
+                build_index(self.faqs, background=background_index)
+            except Exception as e:
+                print(f"Warning: Could not build search index: {e}")
+
+        if watch_files:
+            self._watcher = FileWatcher([faqs_path, dataset_csv_path], self._on_files_changed,
+                                        interval=watch_interval).start()
+
+    @property
+    def faqs(self) -> List[Dict]:
+        return self._data.faqs
+
+    @property
+    def rows(self) -> List[Dict]:
+        return self._data.rows
+
+    @property
+    def row_index(self) -> BM25Index:
+        return self._data.row_index
+
+    def _load_data(self) -> AgentData:
         # Load FAQs
-        self.faqs = _load_faqs(faqs_path)
+        with timed("load FAQs"):
+            faqs = _load_faqs(self.faqs_path)
         
         # Load dataset CSV if exists
-        self.rows = []
-        if os.path.exists(dataset_csv_path):
+        rows = []
+        if os.path.exists(self.dataset_csv_path):
             try:
-                import csv
-                with open(dataset_csv_path, "r", encoding="utf-8") as f:
-                    reader = csv.DictReader(f)
-                    self.rows = [r for r in reader]
+                # columnar store with indexes on employee_id / record_type / date
+                with timed("load dataset CSV"):
+                    rows = RowStore.from_csv(self.dataset_csv_path)
             except Exception as e:
                 print(f"Warning: Could not load dataset CSV: {e}")
-                self.rows = []
-        
-        # Build search index
-        if self.faqs:
-            try:
-                build_index(self.faqs)
-            except Exception as e:
-                print(f"Warning: Could not build search index: {e}")
+                rows = []
+
+        # Inverted index over dataset rows (token -> row ids), built once
+        with timed("build dataset row index"):
+            row_index = BM25Index.from_rows(rows)
+        return AgentData(faqs, rows, row_index)
+
+    def reload(self):
+        """
+        Re-read both data files and rebuild every index, then swap them in.
+        Queries keep using the previous data and index snapshot until then.
+        """
+        with self._reload_lock:
+            t0 = time.perf_counter()
+            data = self._load_data()
+            if data.faqs:
+                build_index(data.faqs)
+            self._data = data
+            self.reload_count += 1
+            print(f"Reloaded data in {time.perf_counter() - t0:.2f}s "
+                  f"({len(data.faqs)} FAQs, {len(data.rows)} rows).")
+
+    def _on_files_changed(self, paths: List[str]):
+        print("Data files changed:", ", ".join(paths))
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"Warning: reload failed, keeping previous data: {e}")
+
+    # Incremental FAQ edits: only the affected entry is re-encoded. Edits are
+    # in-memory; a reload from disk replaces them.
+    def _sync_faqs_from_index(self):
+        snap = current_snapshot()
+        if snap is not None:
+            data = self._data
+            self._data = AgentData(snap.faqs, data.rows, data.row_index)
+
+    def add_faq(self, question: str, answer: str, **extra) -> int:
+        with self._reload_lock:
+            faq_id = _add_faq(dict(extra, question=question, answer=answer))
+            self._sync_faqs_from_index()
+            return faq_id
+
+    def update_faq(self, faq_id: int, question: str, answer: str, **extra):
+        with self._reload_lock:
+            _update_faq(faq_id, dict(extra, question=question, answer=answer))
+            self._sync_faqs_from_index()
+
+    def delete_faq(self, faq_id: int):
+        with self._reload_lock:
+            _delete_faq(faq_id)
+            self._sync_faqs_from_index()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
     
     def load_faqs(self) -> List[Dict]:
         """Return FAQ list"""
@@ -88,6 +190,34 @@ class Agent:
         
         return suggestions[:limit]
     
+    def local_answer(self, user_query: str, min_score: float = 0.0) -> Tuple[Optional[str], Dict]:
+        """
+        (answer, metadata) from the FAQ index alone, no LLM call; answer is
+        None when the FAQs are not confident enough to answer directly.
+        """
+        if not user_query or not user_query.strip():
+            return None, {}
+        data = self._data
+        gen_meta = {}
+        try:
+            response = _local_faq_answer(user_query, data.faqs, data.rows, meta=gen_meta, min_score=min_score)
+        except Exception as e:
+            print(f"Error in local FAQ lookup: {e}")
+            response = None
+        metadata = {"source": gen_meta.get("source", "none")}
+        for key in ("faq_score", "retrieval_mode", "record_query", "index_warming"):
+            if key in gen_meta:
+                metadata[key] = gen_meta[key]
+        if response:
+            try:
+                metadata["escalate"] = should_escalate(user_query)
+            except Exception:
+                metadata["escalate"] = False
+            snap = current_snapshot()
+            if snap is not None:
+                metadata["index_version"] = snap.version
+        return (response or None), metadata
+
     def handle_query(self, user_query: str) -> Tuple[str, Dict]:
         """
         Handle user query and return (response, metadata).
@@ -101,9 +231,13 @@ class Agent:
         except Exception:
             escalate = False
         
+        # one consistent view of the data even if a reload swaps it mid-query
+        data = self._data
+
         # Generate response using support_agent
+        gen_meta = {}
         try:
-            response = _generate_response(user_query, self.faqs, self.rows)
+            response = _generate_response(user_query, data.faqs, data.rows, meta=gen_meta, row_index=data.row_index)
             if not response or not response.strip():
                 response = "I'm sorry, I couldn't find an answer to that question. Please try rephrasing or contact support."
         except Exception as e:
@@ -114,9 +248,17 @@ class Agent:
         
         metadata = {
             "escalate": escalate,
-            "faq_count": len(self.faqs) if self.faqs else 0,
-            "dataset_count": len(self.rows) if self.rows else 0
+            "faq_count": len(data.faqs) if data.faqs else 0,
+            "dataset_count": len(data.rows) if data.rows else 0,
+            "source": gen_meta.get("source", "error"),
         }
+        snap = current_snapshot()
+        if snap is not None:
+            metadata["index_version"] = snap.version
+            metadata["index_build_seconds"] = round(snap.build_seconds, 3)
+        for key in ("faq_score", "retrieval_mode", "dataset_lookup", "speculative", "llm_cache"):
+            if key in gen_meta:
+                metadata[key] = gen_meta[key]
         
         return response, metadata
 
@@ -7,12 +7,33 @@ Optional online AI wrapper. Non-invasive:
     GEMINI_API_KEY -> use Gemini (template)
     OPENAI_API_KEY -> use OpenAI (example)
 - If no key or provider call fails -> returns None (so caller can fallback to offline)
+- ONLINE_MODE=sequential (default) tries the providers one after another.
+  ONLINE_MODE=hedged (opt-in) calls the first provider at once and starts
+  the next one if no good answer arrived within the hedge delay (or the
+  call failed); the first good answer wins, the rest are discarded, and
+  nothing waits past ONLINE_DEADLINE. Every hedge is a second paid call,
+  so the delay defaults to the p95 latency of the provider being waited on
+  (from its circuit breaker window), HEDGE_FALLBACK_DELAY until it has
+  HEDGE_MIN_SAMPLES successful calls, and never past half of
+  ONLINE_DEADLINE; HEDGE_DELAY fixes it instead.
+- get_online_answer(query, meta) fills meta with the provider calls the
+  answer cost ("online_calls", "online_hedges"), which the router puts in
+  the reply metadata; online_stats() has the running totals.
+- Each provider sits behind a circuit breaker (circuit_breaker.py); open
+  providers are skipped, and provider_health() reports their state.
+- Answers are kept in the semantic cache (semantic_cache.py); a question
+  close enough to an earlier one gets the earlier answer without a call.
+  Closeness is judged by the FAQ agent's dense encoder when support_agent
+  has loaded it; without one only the same normalized question hits.
 """
 
 import os
+import sys
 import json
-import requests
-from typing import Optional
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Optional
 from dotenv import load_dotenv
 import os
 
@@ -34,44 +55,210 @@ OPENAI_KEY = os.environ.get("OPENAI_API_KEY")
 
 TIMEOUT = 15  # seconds
 
-def get_online_answer(query: str) -> Optional[str]:
+ONLINE_MODE = os.environ.get("ONLINE_MODE", "sequential").lower()  # sequential | hedged
+# seconds before the next provider is tried; 0 = p95 latency of the provider being waited on
+HEDGE_DELAY = float(os.environ.get("HEDGE_DELAY", "0"))
+HEDGE_FALLBACK_DELAY = float(os.environ.get("HEDGE_FALLBACK_DELAY", "4"))  # until the p95 is known
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "5"))  # successful calls needed for a p95
+ONLINE_DEADLINE = float(os.environ.get("ONLINE_DEADLINE", "10"))  # hard cap for one get_online_answer
+ONLINE_WORKERS = int(os.environ.get("ONLINE_WORKERS", "16"))  # shared by all concurrent queries
+
+# pooled per-provider sessions with retry + jittered backoff
+from llm_clients import post_json, base_url
+# skip providers that are down instead of paying a timeout on every message
+from circuit_breaker import CircuitOpenError, get_breaker, guarded_call, provider_health  # noqa: F401
+# answers to near-identical earlier questions (SQLite, survives restarts)
+from semantic_cache import get_cache
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"queries": 0, "hedges": 0, "discarded": 0, "deadline_misses": 0, "wins": {}}
+
+
+def _providers():
+    """(name, call) for every configured provider, in preference order."""
+    providers = []
+    if GROQ_KEY:
+        providers.append(("groq", call_groq))
+    if GEMINI_KEY:
+        providers.append(("gemini", _call_gemini))
+    if OPENAI_KEY:
+        providers.append(("openai", _call_openai))
+    return providers
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ONLINE_WORKERS, thread_name_prefix="online")
+    return _executor
+
+
+def _count(key: str, n: int = 1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def _count_win(provider: str):
+    with _stats_lock:
+        _stats["wins"][provider] = _stats["wins"].get(provider, 0) + 1
+
+
+def online_stats() -> dict:
+    with _stats_lock:
+        return {**_stats, "wins": dict(_stats["wins"])}
+
+
+def _hedge_delay(name: str) -> float:
+    """Seconds to wait on provider `name` before hedging."""
+    if HEDGE_DELAY > 0:
+        return HEDGE_DELAY
+    p95 = get_breaker(name).latency_quantile(0.95, HEDGE_MIN_SAMPLES)
+    delay = p95 if p95 is not None else HEDGE_FALLBACK_DELAY
+    return min(delay, ONLINE_DEADLINE / 2)  # leave a hedge time to answer before the deadline
+
+
+def _cache_embedder():
+    """The FAQ agent's dense encoder for cache keys if it is loaded, else None (exact matches only)."""
+    agent = sys.modules.get("support_agent")  # never import the FAQ stack just for the cache
+    if agent is None:
+        return None
+    try:
+        return agent._cache_embedder()
+    except Exception:
+        return None
+
+
+def get_online_answer(query: str, meta: Optional[Dict] = None) -> Optional[str]:
     """
-    Try providers in order; return text answer or None.
-    Keep this fast and non-crashing (exceptions -> None).
+    Try providers (hedged or in order); return text answer or None.
+    Keep this fast and non-crashing (exceptions -> None). If `meta` is
+    given it gets the provider calls this answer cost ("online_calls",
+    "online_hedges"; zero for a cache hit, which also sets "llm_cache").
     """
+    if meta is None:
+        meta = {}
+    meta["online_calls"] = 0
+    meta["online_hedges"] = 0
     if not query:
         return None
-
-    # 1) GROQ (template)
-    if GROQ_KEY:
+    _count("queries")
+    cache = get_cache()
+    embedder = _cache_embedder() if cache is not None else None
+    if cache is not None:
         try:
-            return call_groq(query)
+            cached = cache.get("online", query, embedder=embedder)
+            if cached:
+                meta["llm_cache"] = "hit"
+                return cached
         except Exception as e:
-            # log to console for debugging; don't raise
-            print("GROQ call failed:", e)
-
-    # 2) GEMINI (template)
-    if GEMINI_KEY:
+            print("Semantic cache lookup failed:", e)
+    if ONLINE_MODE == "hedged":
+        answer = _hedged_answer(query, meta)
+    else:
+        answer = _sequential_answer(query, meta)
+    if answer and cache is not None:
         try:
-            return _call_gemini(query)
+            cache.put("online", query, answer, embedder=embedder)
         except Exception as e:
-            print("Gemini call failed:", e)
+            print("Semantic cache store failed:", e)
+    return answer
 
-    # 3) OPENAI (example)
-    if OPENAI_KEY:
+
+def _hedged_answer(query: str, meta: Dict) -> Optional[str]:
+    providers = _providers()
+    if not providers:
+        return None
+    deadline = time.monotonic() + ONLINE_DEADLINE
+    pool = _get_executor()
+    pending = {}
+    tickets = {}  # future -> (breaker, ticket from allow())
+    next_provider = 0
+    hedge_delay = HEDGE_FALLBACK_DELAY
+
+    def launch() -> bool:
+        """Start the next provider whose circuit breaker lets a call through."""
+        nonlocal next_provider, hedge_delay
+        while next_provider < len(providers):
+            name, call = providers[next_provider]
+            next_provider += 1
+            breaker = get_breaker(name)
+            ticket = breaker.allow()
+            if ticket is None:
+                continue  # open: skip without a network round trip
+            # an in-flight HTTP call can't be interrupted, so bound it by the deadline instead
+            timeout = max(0.1, min(TIMEOUT, deadline - time.monotonic()))
+            fut = pool.submit(guarded_call, name, call, query, timeout, breaker=breaker, ticket=ticket)
+            pending[fut] = name
+            tickets[fut] = (breaker, ticket)
+            hedge_delay = _hedge_delay(name)
+            meta["online_calls"] += 1
+            return True
+        return False
+
+    if not launch():
+        return None
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _count("deadline_misses")
+                print("Online providers missed the deadline:", ", ".join(pending.values()))
+                return None
+            wait_for = min(remaining, hedge_delay) if next_provider < len(providers) else remaining
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            failed = False
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    text = fut.result()
+                except Exception as e:
+                    print(f"{name} call failed:", e)
+                    failed = True
+                    continue
+                if text and str(text).strip():
+                    _count_win(name)
+                    return text
+                failed = True
+            # hedge when the delay passed with nothing back, or straight away on a failure
+            if next_provider < len(providers) and (failed or not done):
+                hedging = bool(pending)
+                if launch() and hedging:
+                    _count("hedges")
+                    meta["online_hedges"] += 1
+        return None
+    finally:
+        for fut, name in pending.items():
+            if fut.cancel():
+                breaker, ticket = tickets[fut]
+                breaker.release(ticket)  # never ran, so a probe ticket goes back unused
+        if pending:
+            _count("discarded", len(pending))
+
+
+def _sequential_answer(query: str, meta: Dict) -> Optional[str]:
+    for name, call in _providers():
         try:
-            return _call_openai(query)
+            text = guarded_call(name, call, query, TIMEOUT)
+        except CircuitOpenError:
+            continue  # refused without a network call
         except Exception as e:
-            print("OpenAI call failed:", e)
-
+            meta["online_calls"] += 1
+            # log to console for debugging; don't raise
+            print(f"{name} call failed:", e)
+            continue
+        meta["online_calls"] += 1
+        if text:
+            return text
     return None
 
 
 # --- Provider implementations (examples / templates) -------------------
-def call_groq(query):
-    import requests, os
-
-    url = "https://api.groq.com/openai/v1/chat/completions"
+def call_groq(query, timeout: float = TIMEOUT):
+    url = base_url("groq") + "/chat/completions"
     key = os.getenv("GROQ_API_KEY")
 
     payload = {
@@ -85,17 +272,16 @@ def call_groq(query):
         "Content-Type": "application/json"
     }
 
-    resp = requests.post(url, json=payload, headers=headers)
-    resp.raise_for_status()
-    return resp.json()["choices"][0]["message"]["content"]
+    j = post_json("groq", url, payload, headers=headers, timeout=timeout)
+    return j["choices"][0]["message"]["content"]
 
 
 
-def _call_gemini(query: str) -> str:
+def _call_gemini(query: str, timeout: float = TIMEOUT) -> str:
     """
     Template for Google Gemini calls. Replace with actual endpoint and auth per Google's docs.
     """
-    endpoint = "https://gemini.googleapis.com/v1/models/gemini"  # <-- placeholder
+    endpoint = base_url("gemini")  # <-- placeholder (GEMINI_REST_URL)
     headers = {
         "Authorization": f"Bearer {GEMINI_KEY}",
         "Content-Type": "application/json",
@@ -104,9 +290,7 @@ def _call_gemini(query: str) -> str:
         "prompt": query,
         "maxOutputTokens": 512
     }
-    resp = requests.post(endpoint, headers=headers, json=payload, timeout=TIMEOUT)
-    resp.raise_for_status()
-    j = resp.json()
+    j = post_json("gemini", endpoint, payload, headers=headers, timeout=timeout)
     # parse and return a string
     # Update parsing according to Gemini's response shape
     if isinstance(j, dict):
@@ -119,16 +303,15 @@ def _call_gemini(query: str) -> str:
     return str(j)
 
 
-def _call_openai(query: str) -> str:
+def _call_openai(query: str, timeout: float = TIMEOUT) -> str:
     """
     OpenAI example using requests (no dependency on openai package),
     or you can switch to openai.ChatCompletion if you installed openai.
     """
-    import os
     if not OPENAI_KEY:
         raise RuntimeError("OPENAI_KEY missing")
     # Simple ChatCompletion v1 via requests — adjust if using a different api
-    endpoint = "https://api.openai.com/v1/chat/completions"
+    endpoint = base_url("openai") + "/chat/completions"
     headers = {
         "Authorization": f"Bearer {OPENAI_KEY}",
         "Content-Type": "application/json",
@@ -139,9 +322,7 @@ def _call_openai(query: str) -> str:
         "max_tokens": 512,
         "temperature": 0.2,
     }
-    resp = requests.post(endpoint, headers=headers, json=payload, timeout=TIMEOUT)
-    resp.raise_for_status()
-    j = resp.json()
+    j = post_json("openai", endpoint, payload, headers=headers, timeout=timeout)
     # parse ChatCompletion structure
     text = None
     if isinstance(j, dict):
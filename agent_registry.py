@@ -0,0 +1,95 @@
+# agent_registry.py
+"""
+Process-wide registry of Agent instances.
+
+Streamlit runs every browser session in its own thread but inside one Python
+process, so the FAQ list, dataset rows and search indexes only need to be
+loaded once. get_shared_agent() builds the Agent on first use (other callers
+block until it is ready) and hands the same read-only instance to everyone.
+"""
+
+import time
+import threading
+from typing import Dict, Optional
+
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = LOADING
+        self.agent = None
+        self.error: Optional[str] = None
+        self.build_seconds = 0.0
+        self.requests = 0
+
+
+_registry_lock = threading.Lock()
+_entries: Dict[tuple, _Entry] = {}
+
+
+def get_shared_agent(faqs_path: str = "data/faqs_large.json",
+                     dataset_csv_path: str = "data/dataset.csv",
+                     background_index: bool = True,
+                     watch_files: bool = True):
+    """
+    Return the process-wide Agent for these data files, building it on the
+    first call. Raises the construction error (and retries on the next call)
+    if building fails. With watch_files the agent hot-reloads when the data
+    files change.
+    """
+    key = (faqs_path, dataset_csv_path)
+    with _registry_lock:
+        entry = _entries.get(key)
+        if entry is None:
+            entry = _Entry()
+            _entries[key] = entry
+    with entry.lock:
+        entry.requests += 1
+        if entry.state != READY:
+            from agent import Agent
+            entry.state = LOADING
+            t0 = time.perf_counter()
+            try:
+                entry.agent = Agent(faqs_path, dataset_csv_path, background_index=background_index,
+                                    watch_files=watch_files)
+                entry.state = READY
+                entry.error = None
+            except Exception as e:
+                entry.state = FAILED
+                entry.error = str(e)
+                raise
+            finally:
+                entry.build_seconds = time.perf_counter() - t0
+        return entry.agent
+
+
+def registry_status() -> Dict:
+    """Per-agent state for monitoring: load state, build time, index readiness, request count."""
+    try:
+        from support_agent import index_ready
+    except Exception:
+        index_ready = None
+    out = {}
+    with _registry_lock:
+        items = list(_entries.items())
+    for (faqs_path, dataset_path), entry in items:
+        out[f"{faqs_path}|{dataset_path}"] = {
+            "state": entry.state,
+            "error": entry.error,
+            "build_seconds": round(entry.build_seconds, 3),
+            "index_ready": bool(index_ready()) if (index_ready and entry.state == READY) else False,
+            "requests": entry.requests,
+            "reloads": entry.agent.reload_count if entry.agent is not None else 0,
+            "faq_count": len(entry.agent.faqs) if entry.agent is not None else 0,
+        }
+    return out
+
+
+def reset_registry():
+    """Drop all shared agents (used by benchmarks and after data reloads)."""
+    with _registry_lock:
+        _entries.clear()
@@ -0,0 +1,102 @@
+# answer_groups.py
+"""
+Answer table for FAQ sets made mostly of paraphrases.
+
+Generated FAQ files repeat a handful of answers under many question
+wordings. AnswerTable keeps each distinct answer once, maps every FAQ id to
+an answer id, and collapses search hits so one answer fills at most one
+slot of a top-k.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class AnswerTable:
+    """
+    Distinct answers by id plus the answer id of every FAQ id. FAQs that
+    share an answer are pointed at one string object. Treated as immutable
+    once published in a snapshot; edited() returns a modified copy.
+    """
+
+    __slots__ = ("texts", "_by_text", "_of", "_refs", "next_id")
+
+    def __init__(self):
+        self.texts: Dict[int, str] = {}
+        self._by_text: Dict[str, int] = {}
+        self._of: Dict[int, int] = {}
+        self._refs: Dict[int, int] = {}
+        self.next_id = 0
+
+    @classmethod
+    def build(cls, pairs: Iterable[Tuple[int, Dict]]) -> "AnswerTable":
+        """Group (faq_id, faq) pairs by identical answer text."""
+        table = cls()
+        for fid, faq in pairs:
+            table._link(fid, faq)
+        return table
+
+    def _link(self, fid: int, faq: Dict):
+        text = faq.get("answer", "")
+        aid = self._by_text.get(text)
+        if aid is None:
+            aid = self.next_id
+            self.next_id += 1
+            self.texts[aid] = text
+            self._by_text[text] = aid
+            self._refs[aid] = 0
+        elif isinstance(faq, dict) and "answer" in faq:
+            # drop the duplicate string; the FAQ now shares the stored one
+            # (read-only faq_store records already keep each answer once)
+            faq["answer"] = self.texts[aid]
+        self._of[fid] = aid
+        self._refs[aid] += 1
+
+    def _unlink(self, fid: int):
+        aid = self._of.pop(fid, None)
+        if aid is None:
+            return
+        self._refs[aid] -= 1
+        if not self._refs[aid]:
+            del self._refs[aid]
+            del self._by_text[self.texts.pop(aid)]
+
+    def edited(self, remove_id: Optional[int] = None, add: Optional[Tuple[int, Dict]] = None) -> "AnswerTable":
+        """Copy with one FAQ id removed and/or one (faq_id, faq) added."""
+        new = AnswerTable()
+        new.texts = dict(self.texts)
+        new._by_text = dict(self._by_text)
+        new._of = dict(self._of)
+        new._refs = dict(self._refs)
+        new.next_id = self.next_id
+        if remove_id is not None:
+            new._unlink(remove_id)
+        if add is not None:
+            new._link(*add)
+        return new
+
+    def answer_id(self, fid: int) -> Optional[int]:
+        return self._of.get(fid)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def collapse(self, hits: List[Tuple[float, int]], top_k: int) -> List[Tuple[float, int]]:
+        """Keep the best-scoring hit per answer (hits are best first), up to top_k."""
+        seen = set()
+        out = []
+        for score, fid in hits:
+            aid = self._of.get(fid, ("faq", fid))
+            if aid in seen:
+                continue
+            seen.add(aid)
+            out.append((score, fid))
+            if len(out) >= top_k:
+                break
+        return out
+
+    def stats(self) -> Dict:
+        return {
+            "faqs": len(self._of),
+            "answers": len(self.texts),
+            "answer_chars": sum(len(t) for t in self.texts.values()),
+        }
@@ -23,24 +23,29 @@ from ui_components import (
     render_faq_suggestions,
     render_quick_help,
 )
-# voice_mic.render_whatsapp_mic is optional; import safely
-try:
-    from voice_mic import render_whatsapp_mic
-except Exception:
-    render_whatsapp_mic = None
-
-# agent import (offline agent)
+# agent import (offline agent); heavy search backends load lazily inside support_agent
 try:
     from agent import Agent
 except Exception as e:
     Agent = None
     print("agent import failed:", e)
 
-# optional online wrapper
-try:
-    from agent_online import get_online_answer
-except Exception:
-    get_online_answer = None
+from router import route_query
+
+# voice_mic and agent_online are optional and imported on first use
+_optional_imports = {}
+
+def _optional(module: str, name: str):
+    """Import module.name on first call; None if unavailable."""
+    key = (module, name)
+    if key not in _optional_imports:
+        try:
+            mod = __import__(module)
+            _optional_imports[key] = getattr(mod, name)
+        except Exception as e:
+            print(f"{module} import failed:", e)
+            _optional_imports[key] = None
+    return _optional_imports[key]
 
 # hide default Streamlit chrome
 st.markdown("""
@@ -82,7 +87,10 @@ if "input_clear_counter" not in st.session_state:
 if "agent" not in st.session_state:
     if Agent:
         try:
-            st.session_state.agent = Agent()
+            # one Agent per process, shared read-only by every session; its vector
+            # index warms up in a background thread and exact FAQ hits are served meanwhile
+            from agent_registry import get_shared_agent
+            st.session_state.agent = get_shared_agent()
         except Exception as e:
             # fallback to None and continue (UI will still load)
             st.session_state.agent = None
@@ -126,6 +134,7 @@ with main_col1:
 
     # Attempt to render mic; but tolerate missing voice_mic implementation
     transcript = None
+    render_whatsapp_mic = _optional("voice_mic", "render_whatsapp_mic")
     if render_whatsapp_mic:
         try:
             # render_whatsapp_mic returns transcript or None
@@ -196,51 +205,15 @@ if transcript:
 # Process typing indicator and generate a response (single-step, tolerant)
 def produce_agent_response(user_q: str):
     """
-    Try to get an answer from:
-      1) online providers via get_online_answer (if present)
-      2) agent.handle_query(user_q) if available
-      3) agent.generate_response(user_q) or agent.answer(user_q)
+    Route the question (router.route_query):
+      1) confident FAQ answer from the local index (no LLM call)
+      2) online providers via get_online_answer (if present)
+      3) agent.handle_query / generate_response / answer
       4) fallback reply
-    Returns (text, metadata)
+    Returns (text, metadata); metadata["route"] / ["route_ms"] record the path taken.
     """
-    # 1) try online wrapper if available
-    if get_online_answer:
-        try:
-            online = get_online_answer(user_q)
-            if online:
-                return online, {"source": "online"}
-        except Exception:
-            pass
-
-    # 2) if agent has handle_query (which may return (text, metadata))
-    if agent:
-        try:
-            if hasattr(agent, "handle_query"):
-                out = agent.handle_query(user_q)
-                # handle_query may return (text, meta) or just text
-                if isinstance(out, tuple) and len(out) >= 1:
-                    txt = out[0]
-                    meta = out[1] if len(out) > 1 else {}
-                    return txt, meta
-                else:
-                    return str(out), {}
-        except Exception:
-            # swallow and try other ways
-            pass
-
-        # 3) try generate_response / answer
-        try:
-            if hasattr(agent, "generate_response"):
-                txt = agent.generate_response(user_q)
-                return txt, {"source": "agent.generate_response"}
-            if hasattr(agent, "answer"):
-                txt = agent.answer(user_q)
-                return txt, {"source": "agent.answer"}
-        except Exception:
-            pass
-
-    # final fallback
-    return "Sorry — I don't have an answer right now. Please contact support.", {"source": "fallback"}
+    get_online_answer = _optional("agent_online", "get_online_answer")
+    return route_query(user_q, agent, get_online_answer)
 
 # If last message is the typing indicator, produce a response
 if st.session_state.history and st.session_state.history[-1][1] == "Assistant is typing...":
@@ -0,0 +1,91 @@
+# benchmarks/bench_ann.py
+"""
+Recall vs. latency of the ANN index types against the exact flat index.
+
+Synthetic FAQ embeddings are drawn from a mixture of Gaussians (paraphrase
+clusters) and L2-normalized like real sentence embeddings. For every corpus
+size each index type is built with vector_index.build_vector_index and
+compared with IndexFlatIP on recall@k, single-query p50/p99 latency, build
+time and serialized size.
+
+Run from the repo root:
+    python benchmarks/bench_ann.py --sizes 10000,100000,1000000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import faiss  # noqa: E402
+
+import vector_index  # noqa: E402
+
+
+def synthetic_embeddings(n, d, n_clusters, rng):
+    centers = rng.standard_normal((n_clusters, d)).astype(np.float32)
+    assign = rng.integers(0, n_clusters, size=n)
+    x = centers[assign] + 0.35 * rng.standard_normal((n, d)).astype(np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x, centers
+
+
+def make_queries(centers, n_queries, d, rng):
+    idx = rng.integers(0, len(centers), size=n_queries)
+    q = centers[idx] + 0.45 * rng.standard_normal((n_queries, d)).astype(np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    return q
+
+
+def latency_percentiles(index, queries, k):
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q[None, :], k)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return times[len(times) // 2], times[min(len(times) - 1, int(0.99 * len(times)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--types", default=",".join(vector_index.INDEX_TYPES))
+    ap.add_argument("--threads", type=int, default=1, help="faiss OpenMP threads (1 = per-request latency)")
+    args = ap.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    rng = np.random.default_rng(0)
+    types = [t.strip() for t in args.types.split(",") if t.strip()]
+
+    print(f"{'n':>9} {'type':>6} {'recall@%d' % args.k:>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'size MB':>8}")
+    for n in [int(s) for s in args.sizes.split(",")]:
+        x, centers = synthetic_embeddings(n, args.dim, max(10, n // 20), rng)
+        q = make_queries(centers, args.queries, args.dim, rng)
+        ids = np.arange(n, dtype=np.int64)
+
+        truth = None
+        for t in types:
+            t0 = time.perf_counter()
+            index = vector_index.build_vector_index(x, ids, t)
+            build = time.perf_counter() - t0
+            _, found = index.search(q, args.k)
+            if truth is None:
+                # flat comes first in INDEX_TYPES; otherwise compute ground truth separately
+                truth = found if t == "flat" else vector_index.build_vector_index(x, ids, "flat").search(q, args.k)[1]
+            recall = np.mean([len(set(f) & set(g)) / args.k for f, g in zip(found, truth)])
+            p50, p99 = latency_percentiles(index, q, args.k)
+            size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+            print(f"{n:>9} {t:>6} {recall:>9.3f} {p50 * 1000:>8.3f} {p99 * 1000:>8.3f} {build:>8.2f} {size_mb:>8.1f}")
+            del index
+        del x
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_cascade.py
+"""
+Cascade retrieval vs. always-hybrid on a replay of FAQ paraphrases.
+
+Paraphrases of the questions in faqs_large.json (filler prefixes, synonym
+swaps, dropped words, case/punctuation noise) are replayed one query at a
+time through find_similar_faqs with RETRIEVAL_MODE=hybrid and then
+RETRIEVAL_MODE=cascade, with the retrieval cache disabled. Reports the
+fraction of queries the sparse stage short-circuited, per-query latency,
+and top-1 accuracy (the top FAQ has the paraphrased FAQ's answer).
+
+Run from the repo root (needs faiss + sentence-transformers):
+    python benchmarks/bench_cascade.py --queries 2000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import support_agent as sa  # noqa: E402
+
+PREFIXES = ["", "", "hi, ", "quick question: ", "can you tell me ", "i'd like to know ", "please help - "]
+SUFFIXES = ["", "", "?", " thanks", " asap", " please"]
+SYNONYMS = {
+    "how": ["how", "in what way"], "reset": ["reset", "change", "recover"],
+    "password": ["password", "login password"], "contact": ["contact", "reach", "talk to"],
+    "request": ["request", "apply for", "ask for"], "leave": ["leave", "time off", "vacation"],
+    "working": ["working", "office"], "update": ["update", "change", "edit"],
+    "issues": ["issues", "problems"], "order": ["order", "purchase"],
+}
+
+
+def paraphrase(question, rng):
+    words = question.rstrip("?.!").split()
+    out = []
+    for w in words:
+        key = w.lower()
+        if key in SYNONYMS:
+            w = rng.choice(SYNONYMS[key])
+        elif len(words) > 4 and rng.random() < 0.1:
+            continue  # drop a filler word now and then
+        out.append(w)
+    text = rng.choice(PREFIXES) + " ".join(out) + rng.choice(SUFFIXES)
+    return text.lower() if rng.random() < 0.5 else text
+
+
+def percentile(sorted_vals, p):
+    return sorted_vals[min(len(sorted_vals) - 1, int(p * len(sorted_vals)))]
+
+
+def replay(mode, queries, faqs):
+    sa.RETRIEVAL_MODE = mode
+    times, tops = [], []
+    for q, _ in queries:
+        t0 = time.perf_counter()
+        hits = sa.find_similar_faqs(q, faqs, top_k=3)
+        times.append(time.perf_counter() - t0)
+        tops.append(hits[0][1] if hits else None)
+    correct = sum(1 for (_, src), top in zip(queries, tops) if top is not None and top.get("answer") == src.get("answer"))
+    return sorted(times), tops, correct / len(queries)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--faqs", default="data/faqs_large.json")
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    faqs = sa.load_faqs(args.faqs)
+    sa.build_index(faqs)
+    snap = sa.current_snapshot()
+    if snap.mode != "faiss":
+        print("note: dense backend unavailable; the second stage searches TF-IDF instead of FAISS")
+    sa._retrieval_cache.maxsize = 0  # measure every search, not the cache
+
+    rng = random.Random(args.seed)
+    queries = []
+    for _ in range(args.queries):
+        src = rng.choice(faqs)
+        queries.append((paraphrase(src.get("question", ""), rng), src))
+    # warm up the encoder / BM25 code paths before timing
+    for q, _ in queries[:20]:
+        sa._search_batch([q], snap, 3)
+
+    base_times, base_tops, base_acc = replay("hybrid", queries, faqs)
+    before = sa.cascade_stats()
+    cas_times, cas_tops, cas_acc = replay("cascade", queries, faqs)
+    after = sa.cascade_stats()
+    short = after["short_circuited"] - before["short_circuited"]
+    agree = sum(1 for a, b in zip(base_tops, cas_tops) if a is b) / len(queries)
+
+    print(f"faqs={len(faqs)} queries={len(queries)} min_score={sa.CASCADE_MIN_SCORE} "
+          f"min_margin={sa.CASCADE_MIN_MARGIN}")
+    print(f"{'mode':>8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'top1 acc':>9}")
+    for name, times, acc in (("hybrid", base_times, base_acc), ("cascade", cas_times, cas_acc)):
+        print(f"{name:>8} {1000 * sum(times) / len(times):>8.3f} {1000 * percentile(times, 0.5):>8.3f} "
+              f"{1000 * percentile(times, 0.95):>8.3f} {acc:>9.3f}")
+    saved = sum(base_times) - sum(cas_times)
+    print(f"short-circuited: {short}/{len(queries)} ({short / len(queries):.1%})")
+    print(f"latency saved: {1000 * saved / len(queries):.3f} ms/query ({saved / sum(base_times):.1%} of hybrid)")
+    print(f"same top-1 FAQ as hybrid: {agree:.1%}")
+
+
+if __name__ == "__main__":
+    main()
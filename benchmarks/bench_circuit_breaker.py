@@ -0,0 +1,84 @@
+# benchmarks/bench_circuit_breaker.py
+"""
+Cost of a provider outage with and without the circuit breakers in
+agent_online, against the local stub server (benchmarks/stub_server.py).
+
+The primary provider (groq) "goes down" for the middle third of the run:
+its stub path stalls past the call timeout. The backup (openai) stays
+healthy. Without breakers every message waits for the primary's timeout
+before falling back; with them the primary is skipped after a few
+failures and only probed once per cooldown, and it is picked up again
+once it recovers.
+
+Run from the repo root:
+    python benchmarks/bench_circuit_breaker.py --queries 90 --timeout 0.5 --cooldown 2
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import StubServer  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=90)
+    ap.add_argument("--timeout", type=float, default=0.5, help="per-call timeout (s)")
+    ap.add_argument("--cooldown", type=float, default=2.0, help="breaker cooldown (s)")
+    args = ap.parse_args()
+
+    down = {"groq": False}
+    latency = {
+        "/groq": lambda rng: args.timeout * 3 if down["groq"] else rng.uniform(0.02, 0.05),
+        "/openai": (0.05, 0.1),
+    }
+    with StubServer(latency=latency) as stub:
+        os.environ["GROQ_API_KEY"] = os.environ["OPENAI_API_KEY"] = "stub"
+        os.environ.pop("GEMINI_API_KEY", None)
+        os.environ["GROQ_BASE_URL"] = stub.url + "/groq"
+        os.environ["OPENAI_BASE_URL"] = stub.url + "/openai"
+        os.environ["LLM_MAX_RETRIES"] = "0"
+        os.environ["BREAKER_COOLDOWN"] = str(args.cooldown)
+        import circuit_breaker
+        import agent_online
+        import semantic_cache
+        semantic_cache.SEMANTIC_CACHE = False  # every message should reach the providers
+        agent_online.GEMINI_KEY = None
+        agent_online.ONLINE_MODE = "sequential"
+        agent_online.TIMEOUT = args.timeout
+
+        print(f"queries={args.queries} primary down for queries {args.queries // 3}..{2 * args.queries // 3 - 1}, "
+              f"timeout={args.timeout}s cooldown={args.cooldown}s")
+        print(f"{'breaker':>8} {'outage avg ms':>13} {'outage max ms':>13} {'groq reqs in outage':>19} {'wall s':>7}")
+        for enabled in (False, True):
+            circuit_breaker.reset_breakers()
+            circuit_breaker.get_breaker("groq").min_calls = 4 if enabled else 10 ** 9
+            stub.reset_counts()
+            outage, groq_reqs = [], 0
+            t_start = time.perf_counter()
+            for i in range(args.queries):
+                down["groq"] = args.queries // 3 <= i < 2 * args.queries // 3
+                before = stub.requests
+                t0 = time.perf_counter()
+                answer = agent_online.get_online_answer(f"where is my order {i}?")
+                secs = time.perf_counter() - t0
+                assert answer, "no provider answered"
+                if down["groq"]:
+                    outage.append(secs)
+                    # every request beyond the one that answered went to the stalled primary
+                    groq_reqs += stub.requests - before - 1
+            wall = time.perf_counter() - t_start
+            name = "on" if enabled else "off"
+            print(f"{name:>8} {sum(outage) / len(outage) * 1000:>13.0f} {max(outage) * 1000:>13.0f} "
+                  f"{groq_reqs:>19} {wall:>7.2f}")
+        health = agent_online.provider_health()
+        print("groq breaker after recovery:", {k: health["groq"][k] for k in ("state", "opened", "probes", "rejected")})
+
+
+if __name__ == "__main__":
+    main()
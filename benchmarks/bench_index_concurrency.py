@@ -0,0 +1,114 @@
+# benchmarks/bench_index_concurrency.py
+"""
+Concurrency stress test for the index snapshot swap.
+
+N reader threads run find_similar_faqs / find_similar_faqs_batch in a loop
+while one writer thread keeps rebuilding the index from alternating FAQ
+lists. Every result is checked against the snapshot it must have come from
+(each FAQ list is tagged, and a result set may never mix tags). Reports
+errors, reader latency percentiles and the number of swaps.
+
+Run from the repo root:
+    python benchmarks/bench_index_concurrency.py --readers 16 --seconds 10
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import support_agent as sa  # noqa: E402
+
+
+def tagged_copy(faqs, tag, limit=None):
+    out = [dict(f, _tag=tag) for f in faqs]
+    return out[:limit] if limit else out
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--readers", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--faqs", default="data/faqs_large.json")
+    args = ap.parse_args()
+
+    base = sa.load_faqs(args.faqs)
+    if not base:
+        print("No FAQs to index.")
+        return
+    variants = [tagged_copy(base, "A"), tagged_copy(base, "B", limit=max(1, len(base) // 2))]
+    queries = [f["question"] for f in base] + ["password", "leave", "refund status", "salary slip"]
+    sa.build_index(variants[0])
+
+    stop = threading.Event()
+    errors = []
+    latencies = []
+    lat_lock = threading.Lock()
+    swaps = [0]
+
+    def reader(seed):
+        rnd = random.Random(seed)
+        local = []
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                if rnd.random() < 0.2:
+                    batch = [rnd.choice(queries) + " " + str(rnd.randint(0, 999)) for _ in range(8)]
+                    results = sa.find_similar_faqs_batch(batch, variants[0], top_k=5)
+                else:
+                    q = rnd.choice(queries) + " " + str(rnd.randint(0, 999))
+                    results = [sa.find_similar_faqs(q, variants[0], top_k=5)]
+                for res in results:
+                    tags = {f["_tag"] for _, f in res}
+                    if len(tags) > 1:
+                        errors.append(f"mixed snapshot results: {tags}")
+            except Exception as e:
+                errors.append(repr(e))
+            local.append(time.perf_counter() - t0)
+        with lat_lock:
+            latencies.extend(local)
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            try:
+                sa.build_index(variants[i % 2])
+                swaps[0] += 1
+            except Exception as e:
+                errors.append("rebuild: " + repr(e))
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"readers:        {args.readers}")
+    print(f"searches:       {len(latencies)} ({len(latencies) / args.seconds:.0f}/s)")
+    print(f"index swaps:    {swaps[0]}")
+    print(f"latency p50:    {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"latency p99:    {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"errors:         {len(errors)}")
+    for e in errors[:10]:
+        print("  ", e)
+    print(sa.retrieval_cache_stats())
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_llm_clients.py
+"""
+Bare requests.post vs. the pooled llm_clients session, against the local
+stub server (benchmarks/stub_server.py).
+
+Sends the same Groq-style chat request N times, sequentially and from a
+few threads, and reports TCP connections opened (as counted by the stub)
+and per-call latency. A second run makes every 4th stub response a 503 to
+show the jittered retries.
+
+Run from the repo root:
+    python benchmarks/bench_llm_clients.py --calls 200 --threads 4
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+from stub_server import StubServer  # noqa: E402
+
+PAYLOAD = {"model": "llama3-70b-8192", "messages": [{"role": "user", "content": "Where is my order?"}],
+           "max_tokens": 200}
+
+
+def run(call, n_calls, threads):
+    times = []
+
+    def one(_):
+        t0 = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    if threads <= 1:
+        for i in range(n_calls):
+            one(i)
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(one, range(n_calls)))
+    wall = time.perf_counter() - t0
+    times.sort()
+    return wall, times[len(times) // 2], times[min(len(times) - 1, int(0.95 * len(times)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=200)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--latency", type=float, default=0.002, help="stub server time per request (s)")
+    args = ap.parse_args()
+
+    with StubServer(latency=args.latency) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.url
+        import llm_clients
+        url = llm_clients.base_url("groq") + "/chat/completions"
+
+        def bare():
+            r = requests.post(url, json=PAYLOAD, timeout=15)
+            r.raise_for_status()
+            r.json()
+
+        def pooled():
+            llm_clients.post_json("groq", url, PAYLOAD)
+
+        print(f"calls={args.calls} stub latency={args.latency * 1000:.0f} ms")
+        print(f"{'client':>8} {'threads':>7} {'conns':>6} {'wall s':>7} {'p50 ms':>7} {'p95 ms':>7}")
+        for threads in (1, args.threads):
+            for name, call in (("bare", bare), ("pooled", pooled)):
+                stub.reset_counts()
+                wall, p50, p95 = run(call, args.calls, threads)
+                print(f"{name:>8} {threads:>7} {stub.connections:>6} {wall:>7.2f} {p50 * 1000:>7.2f} {p95 * 1000:>7.2f}")
+
+        stub.fail_every = 4
+        stub.reset_counts()
+        before = llm_clients.client_stats().get("groq", {}).get("retries", 0)
+        run(pooled, args.calls, 1)
+        retries = llm_clients.client_stats()["groq"]["retries"] - before
+        print(f"with every 4th response a 503: {args.calls} calls succeeded, {retries} retries, "
+              f"{stub.requests} requests, {stub.connections} connections")
+        llm_clients.close_sessions()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_online_hedging.py
+"""
+Sequential vs. hedged agent_online.get_online_answer against local stub
+providers (benchmarks/stub_server.py) with injected latency distributions.
+
+Each provider gets its own path on one stub server. The primary (groq)
+is usually fast but has a heavy tail; the backups are slower but steady.
+Reports p50/p95/p99/max per mode, how many provider requests each answer
+cost, and the hedge/deadline counters from online_stats().
+
+Run from the repo root:
+    python benchmarks/bench_online_hedging.py --queries 200 --hedge-delay 0.3
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import StubServer  # noqa: E402
+
+
+def tail(fast, slow, p_slow):
+    """`fast` (min, max) seconds, except `slow` (min, max) with probability p_slow."""
+    def sample(rng):
+        lo, hi = slow if rng.random() < p_slow else fast
+        return rng.uniform(lo, hi)
+    return sample
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--hedge-delay", type=float, default=0.3,
+                    help="seconds before hedging; 0 = the provider's measured p95 (the agent_online default)")
+    ap.add_argument("--deadline", type=float, default=3.0)
+    ap.add_argument("--slow-rate", type=float, default=0.1, help="share of primary calls that hit the slow tail")
+    args = ap.parse_args()
+
+    latency = {
+        "/groq": tail((0.05, 0.15), (2.0, 6.0), args.slow_rate),
+        "/gemini": tail((0.2, 0.4), (1.0, 2.0), 0.02),
+        "/openai": (0.3, 0.5),
+    }
+    with StubServer(latency=latency, seed=1) as stub:
+        for provider, env in (("groq", "GROQ"), ("gemini", "GEMINI"), ("openai", "OPENAI")):
+            os.environ[f"{env}_API_KEY"] = "stub"
+        os.environ["GROQ_BASE_URL"] = stub.url + "/groq"
+        os.environ["GEMINI_REST_URL"] = stub.url + "/gemini"
+        os.environ["OPENAI_BASE_URL"] = stub.url + "/openai"
+        os.environ["LLM_MAX_RETRIES"] = "0"
+        import agent_online
+        import semantic_cache
+        semantic_cache.SEMANTIC_CACHE = False  # every message should reach the providers
+        agent_online.HEDGE_DELAY = args.hedge_delay
+        agent_online.ONLINE_DEADLINE = args.deadline
+
+        print(f"queries={args.queries} primary slow-tail rate={args.slow_rate:.0%} "
+              f"hedge delay={args.hedge_delay}s deadline={args.deadline}s")
+        print(f"{'mode':>10} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} {'req/q':>6} {'answered':>8}")
+        for mode in ("sequential", "hedged"):
+            agent_online.ONLINE_MODE = mode
+            stub.reset_counts()
+            times, answered = [], 0
+            for i in range(args.queries):
+                t0 = time.perf_counter()
+                if agent_online.get_online_answer(f"where is my order {i}?"):
+                    answered += 1
+                times.append(time.perf_counter() - t0)
+            times.sort()
+            print(f"{mode:>10} {percentile(times, 0.5) * 1000:>7.0f} {percentile(times, 0.95) * 1000:>7.0f} "
+                  f"{percentile(times, 0.99) * 1000:>7.0f} {times[-1] * 1000:>7.0f} "
+                  f"{stub.requests / args.queries:>6.2f} {answered:>8}")
+        print("hedged counters:", agent_online.online_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_quantization.py
+"""
+Memory vs. accuracy of the quantized FAQ index storage modes.
+
+For each FAQ_INDEX_STORAGE mode the benchmark builds the index over
+synthetic clustered embeddings and reports index memory (serialized size),
+bytes per vector, and top-1 agreement / recall@k with the exact float32 flat
+index, both raw and with float32 re-scoring of the top k*FAQ_RESCORE_FACTOR
+candidates read from a memory-mapped .npy (as the embedding cache is).
+
+Run from the repo root:
+    python benchmarks/bench_quantization.py --n 100000 --index-type flat
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import faiss  # noqa: E402
+
+import vector_index  # noqa: E402
+from bench_ann import synthetic_embeddings, make_queries  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--index-type", default="flat", choices=("flat", "hnsw", "ivf"))
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    x, centers = synthetic_embeddings(args.n, args.dim, max(10, args.n // 20), rng)
+    q = make_queries(centers, args.queries, args.dim, rng)
+    ids = np.arange(args.n, dtype=np.int64)
+
+    # exact ground truth and a memory-mapped float32 copy for re-scoring
+    _, truth = vector_index.build_vector_index(x, ids, "flat").search(q, args.k)
+    tmp = os.path.join(tempfile.mkdtemp(), "vectors.npy")
+    np.save(tmp, x)
+    store = vector_index.RescoreStore(np.load(tmp, mmap_mode="r"), ids, ids)
+
+    fetch = args.k * vector_index.RESCORE_FACTOR
+    mb = 1024 * 1024
+    base_size = None
+    print(f"n={args.n} dim={args.dim} index={args.index_type} k={args.k} rescore candidates={fetch}")
+    print(f"{'storage':>8} {'size MB':>8} {'B/vec':>6} {'saved':>6} {'top1':>6} {'R@k':>6} "
+          f"{'top1+rs':>8} {'R@k+rs':>7} {'build s':>8}")
+    for storage in vector_index.STORAGE_MODES:
+        t0 = time.perf_counter()
+        index = vector_index.build_vector_index(x, ids, args.index_type, storage)
+        build = time.perf_counter() - t0
+        size = faiss.serialize_index(index).nbytes
+        if base_size is None:
+            base_size = size
+
+        _, raw = index.search(q, args.k)
+        _, cand = index.search(q, fetch)
+        rescored = np.array([[fid for _, fid in vector_index.rescore(store, qv, c[c >= 0], args.k)]
+                             for qv, c in zip(q, cand)])
+
+        def agreement(found):
+            top1 = np.mean(found[:, 0] == truth[:, 0])
+            recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+            return top1, recall
+
+        t1, r = agreement(raw)
+        t1r, rr = agreement(rescored)
+        print(f"{storage:>8} {size / mb:>8.1f} {size / args.n:>6.0f} {1 - size / base_size:>6.0%} "
+              f"{t1:>6.3f} {r:>6.3f} {t1r:>8.3f} {rr:>7.3f} {build:>8.2f}")
+    print("note: re-scoring reads float32 rows from the memory-mapped file, which is paged in on demand "
+          "and not counted in the index size.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_router.py
+"""
+Online-first vs. confidence-routed replies (router.route_query) on a
+replayed message mix, with the online providers served by the local stub
+server (benchmarks/stub_server.py) at a remote-LLM-like latency.
+
+The mix: FAQ questions verbatim (suggestion chips), paraphrased FAQ
+questions, off-topic questions the FAQs don't cover, and employee record
+queries. Reports p50/p95 reply latency, online LLM calls per message and
+how many messages took each route.
+
+Run from the repo root:
+    python benchmarks/bench_router.py --messages 300
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import StubServer  # noqa: E402
+from bench_cascade import paraphrase, percentile  # noqa: E402
+
+OFF_TOPIC = [
+    "what's the weather like in Bangalore tomorrow", "can you write me a poem about mondays",
+    "how do I fix a python import error", "recommend a good lunch place near the office",
+    "what is the capital of australia", "explain kubernetes in one sentence",
+]
+
+
+def build_messages(faqs, employee_ids, n, rng):
+    messages = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.4:
+            messages.append(("faq", rng.choice(faqs)["question"]))
+        elif r < 0.7:
+            messages.append(("paraphrase", paraphrase(rng.choice(faqs)["question"], rng)))
+        elif r < 0.9:
+            messages.append(("off_topic", rng.choice(OFF_TOPIC)))
+        else:
+            messages.append(("record", f"{rng.choice(['payroll', 'leave'])} records for {rng.choice(employee_ids)}"))
+    return messages
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=300)
+    ap.add_argument("--faqs", default="data/faqs_large.json")
+    ap.add_argument("--dataset", default="data/dataset.csv")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    with StubServer(latency={"/groq": (0.3, 0.9)}, seed=args.seed) as stub:
+        os.environ["GROQ_API_KEY"] = "stub"
+        os.environ["GROQ_BASE_URL"] = stub.url + "/groq"
+        for key in ("GEMINI_API_KEY", "OPENAI_API_KEY"):
+            os.environ.pop(key, None)
+        import router
+        import agent_online
+        import semantic_cache
+        semantic_cache.SEMANTIC_CACHE = False  # every message should reach the providers
+        from agent import Agent
+        agent_online.GEMINI_KEY = agent_online.OPENAI_KEY = None
+
+        agent = Agent(args.faqs, args.dataset)
+        data = agent._data
+        employee_ids = sorted({r["employee_id"] for r in data.rows})
+        messages = build_messages(list(data.faqs), employee_ids, args.messages, random.Random(args.seed))
+        print(f"messages={len(messages)} mix={dict(Counter(kind for kind, _ in messages))} online latency 300-900 ms")
+        print(f"{'mode':>12} {'p50 ms':>7} {'p95 ms':>7} {'LLM calls/msg':>13}  routes")
+        for enabled in (False, True):
+            router.ROUTER_ENABLED = enabled
+            stub.reset_counts()
+            times, routes = [], Counter()
+            for _, text in messages:
+                t0 = time.perf_counter()
+                _, meta = router.route_query(text, agent, agent_online.get_online_answer)
+                times.append(time.perf_counter() - t0)
+                routes[meta["route"]] += 1
+            times.sort()
+            name = "routed" if enabled else "online-first"
+            print(f"{name:>12} {percentile(times, 0.5) * 1000:>7.0f} {percentile(times, 0.95) * 1000:>7.0f} "
+                  f"{stub.requests / len(messages):>13.2f}  {dict(routes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_row_store.py
+"""
+Memory per row of the columnar RowStore vs. a list of csv.DictReader dicts.
+
+Writes a synthetic dataset.csv (same columns as data/dataset.csv; each
+employee has several records) to a temp file, loads it both ways under
+tracemalloc, and times an indexed lookup ("payroll records for E000123")
+against a linear scan of the dict list.
+
+Run from the repo root:
+    python benchmarks/bench_row_store.py --rows 1000000
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from row_store import RowStore  # noqa: E402
+
+FIRST = ["Anita", "Rajesh", "Sneha", "Manoj", "Priya", "Arjun", "Kavya", "Vikram", "Meera", "Rahul"]
+LAST = ["Rao", "Kumar", "Patel", "Singh", "Sharma", "Iyer", "Nair", "Gupta", "Das", "Menon"]
+DEPARTMENTS = ["Finance", "IT", "HR", "Sales", "Support", "Operations", "Marketing", "Legal"]
+RECORD_TYPES = ["payroll", "leave", "policy", "reimbursement", "appraisal"]
+NOTES = ["Salary processed for {m}, no change", "Approved {d} days leave", "Submitted ID proof",
+         "Salary delayed due to bank hold", "Claim of {d}00 INR approved", "Rating {d} recorded for {m}"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def write_csv(path, n_rows, records_per_employee, rng):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["employee_id", "name", "department", "record_type", "notes", "date"])
+        for i in range(n_rows):
+            emp = i // records_per_employee
+            er = random.Random(emp)  # same name / department on every record of an employee
+            w.writerow([
+                f"E{emp:06d}", f"{er.choice(FIRST)} {er.choice(LAST)}", er.choice(DEPARTMENTS),
+                rng.choice(RECORD_TYPES),
+                rng.choice(NOTES).format(m=rng.choice(MONTHS), d=rng.randint(1, 9)),
+                f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            ])
+
+
+def measure(load):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = load()
+    secs = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, secs, current, peak
+
+
+def timeit(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--records-per-employee", type=int, default=8)
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "dataset.csv")
+    write_csv(path, args.rows, args.records_per_employee, random.Random(0))
+    print(f"rows={args.rows} csv={os.path.getsize(path) / 1e6:.1f} MB")
+
+    def load_dicts():
+        with open(path, "r", encoding="utf-8") as f:
+            return [r for r in csv.DictReader(f)]
+
+    rows, dict_secs, dict_mem, dict_peak = measure(load_dicts)
+    print(f"{'loader':>10} {'load s':>7} {'MB':>8} {'peak MB':>8} {'B/row':>7}")
+    print(f"{'dict list':>10} {dict_secs:>7.2f} {dict_mem / 1e6:>8.1f} {dict_peak / 1e6:>8.1f} {dict_mem / args.rows:>7.0f}")
+    store, store_secs, store_mem, store_peak = measure(lambda: RowStore.from_csv(path))
+    print(f"{'RowStore':>10} {store_secs:>7.2f} {store_mem / 1e6:>8.1f} {store_peak / 1e6:>8.1f} {store_mem / args.rows:>7.0f}")
+    print(f"memory saved: {1 - store_mem / dict_mem:.1%}")
+
+    emp = f"E{(args.rows // args.records_per_employee) // 2:06d}"
+    query = f"payroll records for {emp}"
+    scan = timeit(lambda: [r for r in rows if r["employee_id"] == emp and r["record_type"] == "payroll"], 3)
+    lookup = timeit(lambda: store.lookup_query(query, limit=10), 200)
+    found = store.lookup_query(query, limit=10)[1]
+    expected = [r for r in rows if r["employee_id"] == emp and r["record_type"] == "payroll"][:10]
+    assert [dict(r) for r in found] == expected
+    print(f"'{query}': linear scan {scan * 1000:.1f} ms, indexed lookup {lookup * 1000:.3f} ms ({len(found)} rows)")
+
+
+if __name__ == "__main__":
+    main()
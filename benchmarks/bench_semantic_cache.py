@@ -0,0 +1,101 @@
+# benchmarks/bench_semantic_cache.py
+"""
+Semantic answer cache on a replay of questions that need the LLM.
+
+Messages are drawn from the bench_router.py mix, keeping only those
+generate_response answers with Gemini (off-topic questions, record
+queries, paraphrases the FAQs don't answer confidently), then lightly
+re-worded (filler prefixes / suffixes, case). The Gemini call is simulated
+(sleeps --llm-ms and counts calls; there is no key here). The replay runs
+with the cache off, with a fresh cache, and again after reopening the
+SQLite file (restart). Reports Gemini calls, hit rate, tokens saved and
+mean latency, and checks that record queries for different employees
+never share an answer. Without sentence-transformers the cache only
+matches normalized query text, so reworded questions with a filler
+prefix/suffix miss; with the dense encoder they can hit by similarity.
+
+Run from the repo root:
+    python benchmarks/bench_semantic_cache.py --messages 300 --llm-ms 300
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import support_agent as sa  # noqa: E402
+import semantic_cache  # noqa: E402
+from agent import Agent  # noqa: E402
+from bench_router import build_messages  # noqa: E402
+
+FILLERS = ["", "", "hi, ", "hey ", "quick question: "]
+ENDINGS = ["", "?", " please", " thanks"]
+
+
+def reword(text, rng):
+    text = rng.choice(FILLERS) + text.rstrip("?") + rng.choice(ENDINGS)
+    return text.lower() if rng.random() < 0.5 else text
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=300)
+    ap.add_argument("--llm-ms", type=float, default=300)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    agent = Agent()
+    data = agent._data
+    calls = [0]
+
+    def fake_gemini(prompt, max_output_tokens=256):
+        calls[0] += 1
+        time.sleep(args.llm_ms / 1000)
+        question = prompt.rsplit("User question:", 1)[-1].strip()
+        return f"simulated answer #{calls[0]} to: {question}"
+
+    sa._get_genai = lambda: object()
+    sa._call_gemini_system = fake_gemini
+    sa.SPECULATIVE_LLM = False
+
+    rng = random.Random(args.seed)
+    employee_ids = sorted({r["employee_id"] for r in data.rows})
+    pool = []
+    semantic_cache.SEMANTIC_CACHE = False
+    for _, text in build_messages(list(data.faqs), employee_ids, args.messages * 3, random.Random(args.seed)):
+        meta = {}
+        sa.generate_response(text, data.faqs, data.rows, meta=meta, row_index=data.row_index)
+        if meta.get("source") == "gemini":
+            pool.append(text)
+    messages = [reword(rng.choice(pool), rng) for _ in range(args.messages)]
+    print(f"messages={len(messages)} (from {len(set(pool))} distinct LLM-bound questions) llm={args.llm_ms:.0f} ms")
+
+    path = os.path.join(tempfile.mkdtemp(), "answers.sqlite3")
+    print(f"{'run':>16} {'Gemini calls':>12} {'hit rate':>8} {'tokens saved':>12} {'mean ms':>8}")
+    answers_by_emp = {}
+    for run in ("cache off", "fresh cache", "after restart"):
+        semantic_cache.SEMANTIC_CACHE = run != "cache off"
+        semantic_cache._cache = None if run == "cache off" else semantic_cache.SemanticCache(path)
+        calls[0] = 0
+        t0 = time.perf_counter()
+        for text in messages:
+            answer = sa.generate_response(text, data.faqs, data.rows, row_index=data.row_index)
+            for emp in employee_ids:
+                if emp.lower() in text.lower():
+                    answers_by_emp.setdefault(answer, set()).add(emp)
+        mean_ms = (time.perf_counter() - t0) / len(messages) * 1000
+        stats = semantic_cache.cache_stats() if semantic_cache._cache else {"hit_rate": 0.0, "tokens_saved": 0}
+        print(f"{run:>16} {calls[0]:>12} {stats['hit_rate']:>8.1%} {stats['tokens_saved']:>12} {mean_ms:>8.1f}")
+        if semantic_cache._cache:
+            semantic_cache._cache.close()
+    shared = [a for a, emps in answers_by_emp.items() if len(emps) > 1]
+    print("answers shared between different employees:", len(shared))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_shared_agent.py
+"""
+Per-session Agent vs. one shared Agent.
+
+Measures the startup time and retained Python memory of one Agent build,
+then has N concurrent "sessions" (threads) fetch an agent from
+agent_registry and reports what N private agents would have cost instead.
+
+Run from the repo root:
+    python benchmarks/bench_shared_agent.py --sessions 100
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import Agent  # noqa: E402
+import agent_registry  # noqa: E402
+
+
+def measure_one_agent(faqs_path, dataset_path):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    a = Agent(faqs_path, dataset_path)
+    secs = time.perf_counter() - t0
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return a, secs, retained
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=100)
+    ap.add_argument("--faqs", default="data/faqs_large.json")
+    ap.add_argument("--dataset", default="data/dataset.csv")
+    args = ap.parse_args()
+
+    # warm the imports/model once so the numbers reflect per-session work only
+    Agent(args.faqs, args.dataset)
+    _, per_agent_secs, per_agent_bytes = measure_one_agent(args.faqs, args.dataset)
+
+    agent_registry.reset_registry()
+    got = []
+    barrier = threading.Barrier(args.sessions)
+
+    def session():
+        barrier.wait()
+        got.append(agent_registry.get_shared_agent(args.faqs, args.dataset, background_index=False,
+                                                   watch_files=False))
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=session) for _ in range(args.sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    shared_wall = time.perf_counter() - t0
+    distinct = len({id(a) for a in got})
+
+    n = args.sessions
+    mb = 1024 * 1024
+    print(f"sessions:                 {n}")
+    print(f"distinct agents built:    {distinct}")
+    print(f"one Agent build:          {per_agent_secs * 1000:.1f} ms, {per_agent_bytes / mb:.2f} MB retained (Python heap)")
+    print(f"per-session agents:       {per_agent_secs * n:.2f} s total build, {per_agent_bytes * n / mb:.1f} MB")
+    print(f"shared agent:             {shared_wall:.2f} s wall for all sessions, {per_agent_bytes / mb:.2f} MB")
+    print(f"saved at {n} sessions:    {per_agent_secs * (n - 1):.2f} s of startup, {per_agent_bytes * (n - 1) / mb:.1f} MB")
+    print("note: tracemalloc only sees Python allocations; FAISS/torch buffers add to the per-agent cost.")
+    print(agent_registry.registry_status())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_speculation.py
+"""
+generate_response with and without SPECULATIVE_LLM on a replayed message
+mix (the one from bench_router.py: FAQ questions, paraphrases, off-topic
+questions, employee record queries).
+
+There is no Gemini key here, so the Gemini call is simulated: it sleeps for
+--llm-ms (+-30%) and counts calls. --retrieval-ms adds the latency of the
+dense FAQ search (query encoding + FAISS) that the TF-IDF fallback used
+here does not have. The retrieval and semantic caches are disabled so
+both passes do the same work. Reports p50/p95 over all messages and over
+the ones that needed the LLM, Gemini calls per message, and the
+wasted-call rate (speculative calls that were started but not used).
+
+Run from the repo root:
+    python benchmarks/bench_speculation.py --messages 300 --llm-ms 700 --retrieval-ms 120
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import semantic_cache  # noqa: E402
+import support_agent as sa  # noqa: E402
+from agent import Agent  # noqa: E402
+from speculation import Speculator  # noqa: E402
+from bench_router import build_messages  # noqa: E402
+from bench_cascade import percentile  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=300)
+    ap.add_argument("--llm-ms", type=float, default=700)
+    ap.add_argument("--retrieval-ms", type=float, default=120)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    agent = Agent()
+    data = agent._data
+    sa._retrieval_cache.maxsize = 0
+    semantic_cache.SEMANTIC_CACHE = False  # every LLM-bound message should reach the (simulated) call
+
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+    calls = [0]
+
+    def fake_gemini(prompt, max_output_tokens=256):
+        with rng_lock:
+            calls[0] += 1
+            secs = args.llm_ms / 1000 * rng.uniform(0.7, 1.3)
+        time.sleep(secs)
+        return "simulated answer"
+
+    find_similar = sa._find_similar
+
+    def slow_find_similar(queries, faqs, top_k):
+        time.sleep(args.retrieval_ms / 1000)
+        return find_similar(queries, faqs, top_k)
+
+    sa._get_genai = lambda: object()
+    sa._call_gemini_system = fake_gemini
+    sa._find_similar = slow_find_similar
+
+    employee_ids = sorted({r["employee_id"] for r in data.rows})
+    messages = build_messages(list(data.faqs), employee_ids, args.messages, random.Random(args.seed))
+    print(f"messages={len(messages)} llm={args.llm_ms:.0f} ms retrieval={args.retrieval_ms:.0f} ms")
+    print(f"{'mode':>12} {'p50 ms':>7} {'p95 ms':>7} {'LLM p50':>8} {'LLM p95':>8} {'calls/msg':>9} {'wasted':>7}")
+    for speculative in (False, True):
+        sa.SPECULATIVE_LLM = speculative
+        sa._speculator = Speculator()
+        calls[0] = 0
+        times, llm_times = [], []
+        for _, text in messages:
+            meta = {}
+            t0 = time.perf_counter()
+            sa.generate_response(text, data.faqs, data.rows, meta=meta, row_index=data.row_index)
+            secs = time.perf_counter() - t0
+            times.append(secs)
+            if meta.get("source") == "gemini":
+                llm_times.append(secs)
+        time.sleep(args.llm_ms / 1000 * 1.5)  # let discarded calls finish before counting
+        times.sort()
+        llm_times.sort()
+        stats = sa.speculation_stats()
+        name = "speculative" if speculative else "off"
+        print(f"{name:>12} {percentile(times, 0.5) * 1000:>7.0f} {percentile(times, 0.95) * 1000:>7.0f} "
+              f"{percentile(llm_times, 0.5) * 1000:>8.0f} {percentile(llm_times, 0.95) * 1000:>8.0f} "
+              f"{calls[0] / len(messages):>9.2f} {stats['wasted_rate']:>7.1%}")
+    print("speculation stats:", stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# benchmarks/stub_server.py
+"""
+Local stub LLM HTTP server for offline benchmarks.
+
+Speaks HTTP/1.1 with keep-alive and answers any POST with an OpenAI-style
+chat completion (plus a Gemini-style "candidates" field), after an optional
+artificial latency. It counts accepted TCP connections and requests, so a
+benchmark can check whether clients reuse connections. `fail_every` makes
+every n-th request return 503 to exercise retries.
+
+    with StubServer(latency=0.05) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.url   # before importing llm_clients
+        ...
+        print(stub.connections, stub.requests)
+
+Run standalone to serve until interrupted:
+    python benchmarks/stub_server.py --port 8765 --latency 0.2
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # headers and body go out as separate writes; without TCP_NODELAY a
+    # kept-alive connection stalls ~40 ms on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub._count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        n = stub._count("requests")
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        latency = stub.latency_for(self.path)
+        if latency > 0:
+            time.sleep(latency)
+        if stub.fail_every and n % stub.fail_every == 0:
+            self._reply(503, {"error": "stub overloaded"})
+            return
+        try:
+            prompt = json.loads(body or b"{}")
+        except ValueError:
+            prompt = {}
+        text = f"stub answer from {self.path}"
+        messages = prompt.get("messages") or []
+        if messages:
+            text += f" to: {messages[-1].get('content', '')[:60]}"
+        self._reply(200, {
+            "choices": [{"message": {"role": "assistant", "content": text}}],
+            "candidates": [{"content": text}],
+        })
+
+    def _reply(self, status, obj):
+        data = json.dumps(obj).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # client gave up (timeout / discarded hedge)
+
+
+class StubServer:
+    """
+    Threaded stub server on 127.0.0.1. `latency` is seconds per request, or
+    a dict of path prefix -> (min, max) seconds drawn uniformly per request,
+    or -> a callable taking a random.Random and returning seconds.
+    """
+
+    def __init__(self, port: int = 0, latency=0.0, fail_every: int = 0, seed: int = 0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.connections = 0
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def latency_for(self, path: str) -> float:
+        if isinstance(self.latency, dict):
+            for prefix, spec in self.latency.items():
+                if path.startswith(prefix):
+                    with self._lock:
+                        return spec(self._rng) if callable(spec) else self._rng.uniform(*spec)
+            return 0.0
+        return float(self.latency)
+
+    def _count(self, key: str) -> int:
+        with self._lock:
+            value = getattr(self, key) + 1
+            setattr(self, key, value)
+            return value
+
+    def reset_counts(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--fail-every", type=int, default=0)
+    args = ap.parse_args()
+    stub = StubServer(args.port, args.latency, args.fail_every)
+    print(f"stub LLM server on {stub.url} (Ctrl+C to stop)")
+    try:
+        stub._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._httpd.server_close()
+        print(f"connections={stub.connections} requests={stub.requests}")
+
+
+if __name__ == "__main__":
+    main()
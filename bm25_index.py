@@ -0,0 +1,187 @@
+# bm25_index.py
+"""
+Small in-memory inverted index with BM25 scoring.
+Postings are token -> (doc positions, term frequencies) stored in compact
+arrays, so a query only touches the documents that share at least one token
+with it. Doc ids are caller-chosen non-negative ints (row positions, FAQ
+ids); each document gets the next internal position, and an id <-> position
+map is only kept once some id differs from its position or a document is
+removed, so sparse ids (an FAQ "id" of 50,000,000) cost no more than dense
+ones.
+"""
+
+import re
+import math
+import heapq
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def row_text(row: Dict) -> str:
+    """Flatten a dataset row into searchable text."""
+    return " ".join(str(v) for v in row.values() if v is not None)
+
+
+def _term_counts(tokens: List[str]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for t in tokens:
+        counts[t] = counts.get(t, 0) + 1
+    return counts
+
+
+class BM25Index:
+    def __init__(self, docs: Iterable[str] = (), k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_len = array("I")  # indexed by position; 0 for removed documents
+        self._ids: Optional[array] = None  # position -> doc id, None while they are equal
+        self._pos: Optional[Dict[int, int]] = None  # doc id -> position of its live document
+        self.n_docs = 0
+        self._total_len = 0
+        for doc_id, text in enumerate(docs):
+            self._add(doc_id, tokenize(text))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], **kwargs) -> "BM25Index":
+        return cls((row_text(r) for r in rows), **kwargs)
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[int, str]], **kwargs) -> "BM25Index":
+        """Index (doc_id, text) pairs with caller-chosen ids."""
+        index = cls(**kwargs)
+        for doc_id, text in pairs:
+            index._add(doc_id, tokenize(text))
+        return index
+
+    def _materialize(self):
+        """Switch from ids == positions to an explicit id <-> position map."""
+        if self._ids is None:
+            n = len(self._doc_len)
+            self._ids = array("Q", range(n))
+            self._pos = {i: i for i in range(n)}
+
+    def _add(self, doc_id: int, tokens: List[str]):
+        pos = len(self._doc_len)
+        if self._ids is None and doc_id != pos:
+            self._materialize()
+        if self._ids is not None:
+            self._ids.append(doc_id)
+            self._pos[doc_id] = pos
+        self._doc_len.append(len(tokens))
+        self.n_docs += 1
+        self._total_len += len(tokens)
+        for t, tf in _term_counts(tokens).items():
+            plist = self._postings.get(t)
+            if plist is None:
+                plist = (array("I"), array("I"))
+                self._postings[t] = plist
+            plist[0].append(pos)
+            plist[1].append(tf)
+
+    def edited(self, remove: Optional[Tuple[int, str]] = None,
+               add: Optional[Tuple[int, str]] = None) -> "BM25Index":
+        """
+        Copy with one document removed and/or added, given as (doc_id, text).
+        Only the posting lists of the affected tokens are copied; the rest
+        are shared with this index, which is left untouched.
+        """
+        new = BM25Index(k1=self.k1, b=self.b)
+        new._postings = dict(self._postings)
+        new._doc_len = array("I", self._doc_len)
+        if self._ids is not None:
+            new._ids = array("Q", self._ids)
+            new._pos = dict(self._pos)
+        new.n_docs = self.n_docs
+        new._total_len = self._total_len
+        if remove is not None:
+            doc_id, text = remove
+            tokens = tokenize(text)
+            new._materialize()  # the removed position no longer holds a live document
+            pos = new._pos.pop(doc_id)
+            for t in _term_counts(tokens):
+                plist = new._postings.get(t)
+                if plist is None:
+                    continue
+                keep = [i for i, p in enumerate(plist[0]) if p != pos]
+                if keep:
+                    new._postings[t] = (array("I", (plist[0][i] for i in keep)),
+                                        array("I", (plist[1][i] for i in keep)))
+                else:
+                    del new._postings[t]
+            new._doc_len[pos] = 0
+            new.n_docs -= 1
+            new._total_len -= len(tokens)
+        if add is not None:
+            doc_id, text = add
+            tokens = tokenize(text)
+            for t in _term_counts(tokens):
+                plist = new._postings.get(t)
+                if plist is not None:
+                    new._postings[t] = (array("I", plist[0]), array("I", plist[1]))
+            new._add(doc_id, tokens)
+        return new
+
+    def __len__(self):
+        return self.n_docs
+
+    @property
+    def avg_len(self) -> float:
+        return (self._total_len / self.n_docs) if self.n_docs else 0.0
+
+    def idf(self, token: str) -> float:
+        plist = self._postings.get(token)
+        df = len(plist[0]) if plist is not None else 0
+        return math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def query_weight(self, query: str) -> float:
+        """
+        Sum of idf over the query's distinct tokens: the score of an
+        average-length document containing each query token once. Unknown
+        tokens count at full idf, so queries with many of them score lower
+        relative to this.
+        """
+        return sum(self.idf(t) for t in set(tokenize(query)))
+
+    def search(self, query: str, top_k: int = 5, calibrated: bool = False) -> List[Tuple[float, int]]:
+        """
+        Return up to top_k (score, doc_id) pairs with score > 0, best first.
+        With `calibrated` the documents are still ranked by BM25, but the
+        score returned is the share of query_weight() they match, each
+        token counting at most its idf (repeats and short documents can't
+        make up for a missing token), so in [0, 1].
+        """
+        if not self.n_docs or top_k <= 0:
+            return []
+        k1, b = self.k1, self.b
+        avg_len = self.avg_len or 1.0
+        doc_len = self._doc_len
+        scores: Dict[int, float] = {}
+        matched: Dict[int, float] = {}
+        for t in set(tokenize(query)):
+            plist = self._postings.get(t)
+            if plist is None:
+                continue
+            idf = self.idf(t)
+            for pos, tf in zip(plist[0], plist[1]):
+                norm = k1 * (1.0 - b + b * doc_len[pos] / avg_len)
+                term = idf * tf * (k1 + 1.0) / (tf + norm)
+                scores[pos] = scores.get(pos, 0.0) + term
+                if calibrated:
+                    matched[pos] = matched.get(pos, 0.0) + min(term, idf)
+        if not scores:
+            return []
+        best = heapq.nlargest(top_k, scores.items(), key=lambda kv: (kv[1], -self._id_at(kv[0])))
+        if calibrated:
+            weight = self.query_weight(query) or 1.0
+            return [(matched[pos] / weight, self._id_at(pos)) for pos, _ in best]
+        return [(score, self._id_at(pos)) for pos, score in best]
+
+    def _id_at(self, pos: int) -> int:
+        return self._ids[pos] if self._ids is not None else pos
@@ -0,0 +1,208 @@
+# circuit_breaker.py
+"""
+Per-provider circuit breakers for the online LLM calls.
+
+Each provider keeps a rolling window of its recent calls (at most
+BREAKER_WINDOW calls, none older than BREAKER_WINDOW_SECONDS). The breaker
+
+- closed:    calls go through; it opens once the window holds at least
+             BREAKER_MIN_CALLS calls and either the error rate reaches
+             BREAKER_ERROR_RATE or the share of calls slower than
+             BREAKER_SLOW_SECONDS reaches BREAKER_SLOW_RATE;
+- open:      calls are rejected without touching the network until
+             BREAKER_COOLDOWN seconds have passed;
+- half-open: exactly one probe call is let through; success closes the
+             breaker (with a fresh window), failure re-opens it for another
+             cooldown.
+
+So an outage costs one probe per cooldown instead of a timeout per user
+message. provider_health() returns every breaker's state and counters.
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+BREAKER_WINDOW = int(os.environ.get("BREAKER_WINDOW", "20"))  # calls kept in the rolling window
+BREAKER_WINDOW_SECONDS = float(os.environ.get("BREAKER_WINDOW_SECONDS", "120"))
+BREAKER_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", "4"))  # don't judge a provider on fewer calls
+BREAKER_ERROR_RATE = float(os.environ.get("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_SECONDS = float(os.environ.get("BREAKER_SLOW_SECONDS", "8"))
+BREAKER_SLOW_RATE = float(os.environ.get("BREAKER_SLOW_RATE", "0.8"))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "30"))  # seconds open before a probe
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is refused because the provider's breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, window: int = BREAKER_WINDOW, window_seconds: float = BREAKER_WINDOW_SECONDS,
+                 min_calls: int = BREAKER_MIN_CALLS, error_rate: float = BREAKER_ERROR_RATE,
+                 slow_seconds: float = BREAKER_SLOW_SECONDS, slow_rate: float = BREAKER_SLOW_RATE,
+                 cooldown: float = BREAKER_COOLDOWN, clock=time.monotonic):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)  # (finished_at, ok, seconds)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._generation = 0  # bumped on every trip, so late calls from before it can be told apart
+        self.counts = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0, "probes": 0}
+
+    def allow(self) -> Optional[Tuple[int, bool]]:
+        """
+        A ticket (breaker generation, is_probe) if a call may go out now,
+        else None. In half-open state this hands out the single probe slot;
+        every ticket must be passed back to record() or release(). Only the
+        probe's own ticket settles half-open, and tickets from before the
+        last trip are ignored.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return (self._generation, False)
+            if self.state == OPEN and self._clock() - self._opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.counts["probes"] += 1
+                return (self._generation, True)
+            self.counts["rejected"] += 1
+            return None
+
+    def release(self, ticket: Tuple[int, bool]):
+        """Give back a ticket from allow() whose call never ran (e.g. a cancelled future)."""
+        generation, probe = ticket
+        with self._lock:
+            if probe and generation == self._generation and self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record(self, ok: bool, seconds: float, ticket: Optional[Tuple[int, bool]] = None):
+        now = self._clock()
+        slow = seconds >= self.slow_seconds
+        with self._lock:
+            generation, probe = ticket if ticket is not None else (self._generation, False)
+            self.counts["calls"] += 1
+            if not ok:
+                self.counts["failures"] += 1
+            if slow:
+                self.counts["slow"] += 1
+            if generation != self._generation:
+                return  # admitted before the breaker last opened; finishing late says nothing new
+            if probe:
+                if self.state == HALF_OPEN:
+                    self._probe_in_flight = False
+                    if ok and not slow:
+                        self.state = CLOSED
+                        self._calls.clear()
+                    else:
+                        self._trip(now)
+                return
+            if self.state != CLOSED:
+                return
+            self._calls.append((now, ok, seconds))
+            self._expire(now)
+            n = len(self._calls)
+            if n < self.min_calls:
+                return
+            failures = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+            slow_calls = sum(1 for _, _, secs in self._calls if secs >= self.slow_seconds)
+            if failures / n >= self.error_rate or slow_calls / n >= self.slow_rate:
+                self._trip(now)
+
+    def _trip(self, now: float):
+        self._generation += 1
+        self.state = OPEN
+        self._opened_at = now
+        self.counts["opened"] += 1
+        self._calls.clear()
+
+    def _expire(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def latency_quantile(self, q: float, min_calls: int = 1) -> Optional[float]:
+        """Seconds at quantile q of the successful calls in the window; None with fewer than min_calls."""
+        with self._lock:
+            self._expire(self._clock())
+            secs = sorted(s for _, ok, s in self._calls if ok)
+        if not secs or len(secs) < min_calls:
+            return None
+        return secs[max(0, math.ceil(q * len(secs)) - 1)]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._expire(self._clock())
+            n = len(self._calls)
+            snap = {
+                "state": self.state,
+                "window_calls": n,
+                "window_error_rate": (sum(1 for _, ok, _ in self._calls if not ok) / n) if n else 0.0,
+                "window_avg_seconds": (sum(s for _, _, s in self._calls) / n) if n else 0.0,
+                **self.counts,
+            }
+            if self.state == OPEN:
+                snap["retry_in"] = max(0.0, self.cooldown - (self._clock() - self._opened_at))
+            return snap
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def guarded_call(name: str, fn, *args, breaker: Optional[CircuitBreaker] = None,
+                 ticket: Optional[Tuple[int, bool]] = None, **kwargs):
+    """
+    Call fn(*args, **kwargs) through the breaker for `name`, recording the
+    outcome and latency. Raises CircuitOpenError if the breaker refuses the
+    call. Pass the `ticket` when the caller already took one from allow().
+    """
+    breaker = breaker or get_breaker(name)
+    if ticket is None:
+        ticket = breaker.allow()
+        if ticket is None:
+            raise CircuitOpenError(f"{name} circuit open")
+    t0 = time.monotonic()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception:
+        breaker.record(False, time.monotonic() - t0, ticket)
+        raise
+    breaker.record(True, time.monotonic() - t0, ticket)
+    return result
+
+
+def provider_health() -> Dict[str, Dict]:
+    """State and counters of every provider breaker, for monitoring."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
@@ -10,6 +10,10 @@ try:
     if hasattr(agent, "load_faqs"):
         faqs = agent.load_faqs()
         print("load_faqs() returned type:", type(faqs), "len:", len(faqs))
+    if hasattr(agent, "Agent"):
+        agent.Agent()
+        import support_agent
+        print(support_agent.startup_report())
 except Exception:
     print("IMPORT TRACEBACK:")
     traceback.print_exc()
@@ -0,0 +1,144 @@
+# embedding_cache.py
+"""
+Persistent embedding store for the FAQ vector index.
+
+Each FAQ vector is keyed by a hash of the embedding model name and the FAQ's
+question + answer text, so a restart only has to encode FAQs that are new or
+changed. The vectors live in a plain .npy file (opened memory-mapped) next to
+a small JSON file holding the keys in row order.
+"""
+
+import os
+import json
+import hashlib
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+CACHE_DIR = os.environ.get("EMBED_CACHE_DIR", os.path.join("data", ".embed_cache"))
+
+
+def faq_text(faq: Dict) -> str:
+    """Text that gets embedded for a FAQ (kept in one place so keys stay in sync)."""
+    return faq.get("question", "") + " " + faq.get("answer", "")
+
+
+def faq_key(faq: Dict, model_name: str) -> str:
+    h = hashlib.sha1()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(faq_text(faq).encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Keyed store of embedding vectors for one model.
+    Vectors are loaded lazily with mmap_mode="r", so only rows that are
+    actually looked up get paged in.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = CACHE_DIR):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        slug = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+        self.vectors_path = os.path.join(cache_dir, f"{slug}.npy")
+        self.keys_path = os.path.join(cache_dir, f"{slug}.keys.json")
+        self._vectors = None
+        self._pos: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.vectors_path) and os.path.exists(self.keys_path)):
+            return
+        try:
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                keys = json.load(f)
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+            if vectors.ndim != 2 or vectors.shape[0] != len(keys):
+                print("Embedding cache is inconsistent; ignoring it.")
+                return
+            self._vectors = vectors
+            self._pos = {k: i for i, k in enumerate(keys)}
+        except Exception as e:
+            print("Could not read embedding cache:", e)
+            self._vectors = None
+            self._pos = {}
+
+    def __len__(self):
+        return len(self._pos)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        i = self._pos.get(key)
+        if i is None or self._vectors is None:
+            return None
+        return np.asarray(self._vectors[i], dtype=np.float32)
+
+    @property
+    def vectors(self) -> Optional[np.ndarray]:
+        """The stored (memory-mapped) matrix; rows are addressed via rows_for()."""
+        return self._vectors
+
+    def rows_for(self, keys: List[str]) -> np.ndarray:
+        """Row numbers of `keys` in `vectors` (-1 for keys not in the store)."""
+        return np.fromiter((self._pos.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+
+    def encode(self, faqs: List[Dict], encode_fn: Callable[[List[str]], np.ndarray],
+               keys: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Return an (n, d) float32 matrix of embeddings for `faqs`, calling
+        `encode_fn` only for FAQs missing from the cache. The store is
+        rewritten to match `faqs` when anything had to be encoded.
+        """
+        if keys is None:
+            keys = [faq_key(f, self.model_name) for f in faqs]
+        missing = [i for i, k in enumerate(keys) if k not in self._pos]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        new_embs = None
+        if missing:
+            new_embs = np.asarray(encode_fn([faq_text(faqs[i]) for i in missing]), dtype=np.float32)
+
+        if self._vectors is not None:
+            d = self._vectors.shape[1]
+        elif new_embs is not None:
+            d = new_embs.shape[1]
+        else:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        out = np.empty((len(keys), d), dtype=np.float32)
+        if self._vectors is not None and len(missing) < len(keys):
+            cached_rows = [i for i, k in enumerate(keys) if k in self._pos]
+            src = np.fromiter((self._pos[keys[i]] for i in cached_rows), dtype=np.int64, count=len(cached_rows))
+            out[cached_rows] = self._vectors[src]
+        if new_embs is not None:
+            out[missing] = new_embs
+            self._save(keys, out)
+        return out
+
+    def _save(self, keys: List[str], vectors: np.ndarray):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # drop our memmap before replacing the file it points at
+            self._vectors = None
+            tmp_vec = self.vectors_path + ".tmp.npy"
+            tmp_keys = self.keys_path + ".tmp"
+            np.save(tmp_vec, vectors)
+            with open(tmp_keys, "w", encoding="utf-8") as f:
+                json.dump(keys, f)
+            os.replace(tmp_vec, self.vectors_path)
+            os.replace(tmp_keys, self.keys_path)
+            self._load()
+            if self._vectors is not None:
+                return
+        except Exception as e:
+            print("Could not write embedding cache:", e)
+        # keep serving from memory if the store could not be written or re-read
+        self._vectors = vectors
+        self._pos = {k: i for i, k in enumerate(keys)}
+
+    def stats(self) -> Dict:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,152 @@
+# faq_dedup.py
+"""
+Streaming near-duplicate removal for FAQ files (MinHash + LSH).
+
+Each question is reduced to a MinHash signature over its word tokens; LSH
+bands bucket signatures so a new FAQ is only compared with earlier FAQs
+that collide in at least one band. A FAQ is dropped when an earlier kept
+FAQ has the same answer and an estimated question Jaccard similarity at or
+above the threshold ("How do I do I reset my password?" vs. "How do I reset
+my password?"). Near-identical questions with different answers are kept.
+
+Records are read and written one at a time, so only the signatures and
+band buckets of the kept FAQs stay in memory.
+
+Usage:
+    python faq_dedup.py data/faqs_large.json data/faqs_dedup.json --threshold 0.8
+"""
+
+import os
+import re
+import sys
+import json
+import zlib
+import argparse
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from faq_store import iter_faqs, open_writer
+
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))
+NUM_PERM = 64
+EMBED_DIM = int(os.environ.get("EMBED_DIM", "384"))  # for the index size estimate (all-MiniLM-L6-v2)
+
+_TOKEN_RE = re.compile(r"\w+")
+_PRIME = (1 << 31) - 1
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) whose LSH collision curve steps up closest to `threshold`."""
+    best = None
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        step = (1.0 / bands) ** (1.0 / rows)
+        if best is None or abs(step - threshold) < best[0]:
+            best = (abs(step - threshold), bands, rows)
+    return best[1], best[2]
+
+
+class MinHashDeduper:
+    """Incremental near-duplicate filter; call keep() once per FAQ in order."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = NUM_PERM, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+        self._answers: List[int] = []
+        self.seen = 0
+        self.dropped = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        toks = set(_tokens(text))
+        if not toks:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        x = np.fromiter((zlib.crc32(t.encode("utf-8")) & _PRIME for t in toks), dtype=np.uint64, count=len(toks))
+        return ((np.outer(x, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def keep(self, faq: Dict) -> bool:
+        """True if `faq` is new; False if it near-duplicates a FAQ already kept."""
+        self.seen += 1
+        sig = self.signature(faq.get("question", ""))
+        answer = zlib.crc32(" ".join(_tokens(faq.get("answer", ""))).encode("utf-8"))
+        keys = [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        checked = set()
+        for band, key in enumerate(keys):
+            for j in self._buckets[band].get(key, ()):
+                if j in checked:
+                    continue
+                checked.add(j)
+                if self._answers[j] == answer and np.mean(self._signatures[j] == sig) >= self.threshold:
+                    self.dropped += 1
+                    return False
+        idx = len(self._signatures)
+        self._signatures.append(sig)
+        self._answers.append(answer)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(idx)
+        return True
+
+    def filter(self, faqs: Iterable[Dict]) -> Iterator[Dict]:
+        for faq in faqs:
+            if self.keep(faq):
+                yield faq
+
+
+def dedupe_file(src: str, dst: str, threshold: float = DEDUP_THRESHOLD) -> Dict:
+    """Stream `src` into `dst` without near-duplicates; returns size_report()."""
+    deduper = MinHashDeduper(threshold)
+    bytes_in = bytes_out = 0
+    with open_writer(dst) as out:
+        for faq in iter_faqs(src):
+            size = len(json.dumps(faq, ensure_ascii=False).encode("utf-8"))
+            bytes_in += size
+            if deduper.keep(faq):
+                out.write(faq)
+                bytes_out += size
+    return size_report(deduper.seen, deduper.seen - deduper.dropped, bytes_in, bytes_out)
+
+
+def size_report(faqs_in: int, faqs_out: int, bytes_in: int, bytes_out: int, dim: int = EMBED_DIM) -> Dict:
+    """Corpus size and the float32 flat vector index size (dim*4 bytes per FAQ) before and after."""
+    return {
+        "faqs_in": faqs_in, "faqs_out": faqs_out,
+        "faqs_removed": faqs_in - faqs_out,
+        "corpus_bytes_in": bytes_in, "corpus_bytes_out": bytes_out,
+        "index_bytes_in": faqs_in * dim * 4, "index_bytes_out": faqs_out * dim * 4,
+        "reduction": (1 - faqs_out / faqs_in) if faqs_in else 0.0,
+    }
+
+
+def format_report(report: Dict) -> str:
+    kb = 1024.0
+    return (f"FAQs: {report['faqs_in']} -> {report['faqs_out']} ({report['reduction']:.1%} removed); "
+            f"corpus {report['corpus_bytes_in'] / kb:.1f} KB -> {report['corpus_bytes_out'] / kb:.1f} KB; "
+            f"vector index {report['index_bytes_in'] / kb:.1f} KB -> {report['index_bytes_out'] / kb:.1f} KB")
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Drop near-duplicate FAQs (MinHash + LSH).")
+    ap.add_argument("src")
+    ap.add_argument("dst")
+    ap.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD,
+                    help="estimated question Jaccard similarity at which a same-answer FAQ is dropped")
+    args = ap.parse_args(argv)
+    if os.path.abspath(args.src) == os.path.abspath(args.dst):
+        sys.exit("src and dst must differ (the input is streamed while the output is written)")
+    print(format_report(dedupe_file(args.src, args.dst, args.threshold)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+# faq_store.py
+"""
+FAQ file formats beyond a single JSON array.
+
+- .json    JSON array (read whole, as before, or streamed with iter_faqs)
+- .jsonl   JSON Lines, streamed one record at a time
+- .faqbin  compact binary store: an offset table plus one UTF-8 blob,
+           opened memory-mapped. Each distinct answer is stored once.
+
+open_faqs() picks the loader by extension. A .faqbin file (and a .jsonl
+file, which is converted once into a cached .faqbin next to the embedding
+cache) is returned as a FaqStore: a read-only sequence whose items decode
+their question / answer from the mapped file only when accessed, so
+loading costs the same whatever the corpus size.
+
+Binary layout (little-endian):
+    magic "FAQSTOR1", then u64 n, n_answers, blob_len, reserved
+    i64[n] ids (-1 = none) | u64[2n] question spans | u32[n] answer index
+    u64[2*n_answers] answer spans | u64[2n] extra-field spans | blob
+Spans are (start, end) byte offsets into the blob; extra fields (anything
+besides id / question / answer) are a JSON object, empty span if none.
+
+Usage:
+    python faq_store.py data/faqs_large.json data/faqs_large.faqbin
+"""
+
+import os
+import sys
+import json
+import mmap
+import shutil
+import struct
+import hashlib
+import argparse
+import tempfile
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Optional
+
+STORE_DIR = os.environ.get("FAQ_STORE_DIR", os.path.join("data", ".faq_store"))
+
+MAGIC = b"FAQSTOR1"
+_HEADER = struct.Struct("<8sQQQQ")
+_FIELDS = ("id", "question", "answer")
+
+
+def iter_faqs(path: str) -> Iterator[Dict]:
+    """Stream FAQ records from a JSON array, JSON Lines or .faqbin file without loading it whole."""
+    if path.endswith(".faqbin"):
+        for faq in FaqStore(path):
+            yield dict(faq)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+        decoder = json.JSONDecoder()
+        buf = ""
+        pos = 0
+        started = False
+        while True:
+            chunk = f.read(1 << 16)
+            buf = buf[pos:] + chunk
+            pos = 0
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,﻿":
+                    pos += 1
+                if pos >= len(buf):
+                    break
+                if not started:
+                    if buf[pos] != "[":
+                        raise ValueError(f"{path}: expected a JSON array of FAQs")
+                    started = True
+                    pos += 1
+                    continue
+                if buf[pos] == "]":
+                    return
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if not chunk:
+                        raise
+                    break  # record continues in the next chunk
+                yield obj
+                pos = end
+            if not chunk:
+                return
+
+
+class FaqWriter:
+    """Write FAQs one at a time as a JSON array (or JSON Lines for .jsonl paths)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lines = path.endswith(".jsonl")
+        self.count = 0
+        self._tmp = path + ".tmp"
+        self._f = open(self._tmp, "w", encoding="utf-8")
+        if not self.lines:
+            self._f.write("[")
+
+    def write(self, faq: Dict):
+        self.write_line(json.dumps(faq, ensure_ascii=False))
+
+    def write_line(self, text: str):
+        """Write one FAQ already serialized as single-line JSON."""
+        if self.lines:
+            self._f.write(text + "\n")
+        else:
+            self._f.write(("," if self.count else "") + "\n  " + text)
+        self.count += 1
+
+    def close(self):
+        if not self.lines:
+            self._f.write("\n]\n")
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        """Discard the partial output; the destination file is left as it was."""
+        self._f.close()
+        os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class StoreWriter(FaqWriter):
+    """
+    Write FAQs one at a time into a .faqbin store. Text goes straight to a
+    temporary blob file; only the span tables (about 44 bytes per FAQ) and
+    the distinct answers are kept in memory until close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._tmp = path + ".tmp"
+        self._blob = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+        self._blob_len = 0
+        self._ids = array("q")
+        self._q_spans = array("Q")
+        self._a_idx = array("I")
+        self._a_spans = array("Q")
+        self._x_spans = array("Q")
+        self._answers: Dict[str, int] = {}
+
+    def _append(self, text: str, spans: array):
+        data = text.encode("utf-8")
+        self._blob.write(data)
+        spans.append(self._blob_len)
+        self._blob_len += len(data)
+        spans.append(self._blob_len)
+
+    def write(self, faq: Dict):
+        fid = faq.get("id")
+        self._ids.append(fid if isinstance(fid, int) and not isinstance(fid, bool) and fid >= 0 else -1)
+        self._append(str(faq.get("question", "")), self._q_spans)
+        answer = str(faq.get("answer", ""))
+        aid = self._answers.get(answer)
+        if aid is None:
+            aid = len(self._answers)
+            self._answers[answer] = aid
+            self._append(answer, self._a_spans)
+        self._a_idx.append(aid)
+        extra = {k: v for k, v in faq.items() if k not in _FIELDS}
+        self._append(json.dumps(extra, ensure_ascii=False) if extra else "", self._x_spans)
+        self.count += 1
+
+    def write_line(self, text: str):
+        self.write(json.loads(text))
+
+    def close(self):
+        import numpy as np
+        with open(self._tmp, "wb") as out:
+            out.write(_HEADER.pack(MAGIC, self.count, len(self._answers), self._blob_len, 0))
+            for table, dtype in ((self._ids, "<i8"), (self._q_spans, "<u8"), (self._a_idx, "<u4"),
+                                 (self._a_spans, "<u8"), (self._x_spans, "<u8")):
+                out.write(np.asarray(table, dtype=dtype).tobytes())
+            self._blob.seek(0)
+            shutil.copyfileobj(self._blob, out, 1 << 20)
+        self._blob.close()
+        self._answers = {}
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._blob.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+
+def open_writer(path: str) -> FaqWriter:
+    return StoreWriter(path) if path.endswith(".faqbin") else FaqWriter(path)
+
+
+class StoredFaq(Mapping):
+    """Read-only FAQ record backed by a FaqStore; fields are decoded on access."""
+
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: "FaqStore", i: int):
+        self._store = store
+        self._i = i
+
+    def __getitem__(self, key):
+        value = self._store._field(self._i, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return iter(self._store._keys(self._i))
+
+    def __len__(self):
+        return len(self._store._keys(self._i))
+
+    def __repr__(self):
+        return f"StoredFaq({dict(self)!r})"
+
+
+class FaqStore(Sequence):
+    """Memory-mapped .faqbin file as a read-only sequence of StoredFaq records."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, n_answers, blob_len, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a FAQ store")
+        pos = _HEADER.size
+        import numpy as np
+
+        def table(dtype, count):
+            nonlocal pos
+            arr = np.frombuffer(self._mm, dtype=dtype, count=count, offset=pos)
+            pos += arr.nbytes
+            return arr
+
+        self._n = n
+        self._ids = table("<i8", n)
+        self._q_spans = table("<u8", 2 * n)
+        self._a_idx = table("<u4", n)
+        self._a_spans = table("<u8", 2 * n_answers)
+        self._x_spans = table("<u8", 2 * n)
+        self._blob = pos
+        self.n_answers = n_answers
+        if pos + blob_len > len(self._mm):
+            raise ValueError(f"{path}: truncated FAQ store")
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [StoredFaq(self, j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("FAQ index out of range")
+        return StoredFaq(self, i)
+
+    def _text(self, spans, j: int) -> str:
+        start, end = int(spans[2 * j]), int(spans[2 * j + 1])
+        return self._mm[self._blob + start:self._blob + end].decode("utf-8")
+
+    def question(self, i: int) -> str:
+        return self._text(self._q_spans, i)
+
+    def answer_id(self, i: int) -> int:
+        return int(self._a_idx[i])
+
+    def answer(self, i: int) -> str:
+        return self._text(self._a_spans, self.answer_id(i))
+
+    def extra(self, i: int) -> Dict:
+        text = self._text(self._x_spans, i)
+        return json.loads(text) if text else {}
+
+    def _field(self, i: int, key):
+        if key == "question":
+            return self.question(i)
+        if key == "answer":
+            return self.answer(i)
+        if key == "id":
+            fid = int(self._ids[i])
+            return fid if fid >= 0 else None
+        return self.extra(i).get(key)
+
+    def _keys(self, i: int) -> List[str]:
+        keys = ["id"] if self._ids[i] >= 0 else []
+        return keys + ["question", "answer"] + list(self.extra(i))
+
+    def close(self):
+        self._mm.close()
+
+
+def write_store(faqs: Iterable[Dict], path: str) -> int:
+    with StoreWriter(path) as out:
+        for faq in faqs:
+            out.write(faq)
+        return out.count
+
+
+def _cached_store_path(src: str) -> str:
+    st = os.stat(src)
+    h = hashlib.sha1(f"{os.path.abspath(src)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(STORE_DIR, f"{os.path.basename(src)}.{h}.faqbin")
+
+
+def open_faqs(path: str):
+    """
+    Load FAQs by extension: .faqbin is memory-mapped, .jsonl is streamed
+    into a cached .faqbin once (re-done when the file changes) and mapped,
+    anything else is read as a JSON array into a list of dicts.
+    """
+    if path.endswith(".faqbin"):
+        return FaqStore(path)
+    if path.endswith(".jsonl"):
+        cached = _cached_store_path(path)
+        if not os.path.exists(cached):
+            os.makedirs(STORE_DIR, exist_ok=True)
+            n = write_store(iter_faqs(path), cached)
+            print(f"Converted {path} to {cached} ({n} FAQs).")
+            prefix = os.path.basename(path) + "."
+            for name in os.listdir(STORE_DIR):
+                if name.startswith(prefix) and name.endswith(".faqbin") and os.path.join(STORE_DIR, name) != cached:
+                    try:
+                        os.remove(os.path.join(STORE_DIR, name))
+                    except OSError:
+                        pass
+        return FaqStore(cached)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def convert(src: str, dst: str) -> int:
+    """Stream FAQs from `src` into `dst`; formats are picked by extension."""
+    with open_writer(dst) as out:
+        for faq in iter_faqs(src):
+            out.write(faq)
+        return out.count
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Convert FAQ files between .json, .jsonl and .faqbin.")
+    ap.add_argument("src")
+    ap.add_argument("dst")
+    args = ap.parse_args(argv)
+    if os.path.abspath(args.src) == os.path.abspath(args.dst):
+        sys.exit("src and dst must differ")
+    n = convert(args.src, args.dst)
+    print(f"Wrote {args.dst} ({n} FAQs, {os.path.getsize(args.dst) / 1024:.1f} KB).")
+
+
+if __name__ == "__main__":
+    main()
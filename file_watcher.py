@@ -0,0 +1,80 @@
+# file_watcher.py
+"""
+Polling file watcher (no external service or inotify dependency).
+
+Each poll stats the watched files; only when mtime or size changed is the
+file re-hashed, and the callback fires only if the content hash actually
+differs from the last one seen. Used by Agent to hot-reload the FAQ and
+dataset files.
+"""
+
+import os
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> Optional[str]:
+    try:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+def _stat(path: str) -> Optional[Tuple[float, int]]:
+    try:
+        st = os.stat(path)
+        return st.st_mtime, st.st_size
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    def __init__(self, paths: Iterable[str], on_change: Callable[[List[str]], None], interval: float = 5.0):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self._stats: Dict[str, Optional[Tuple[float, int]]] = {}
+        self._digests: Dict[str, Optional[str]] = {}
+        for p in self.paths:
+            self._stats[p] = _stat(p)
+            self._digests[p] = file_digest(p)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self) -> List[str]:
+        """Check all files once; returns the paths whose content changed."""
+        changed = []
+        for p in self.paths:
+            st = _stat(p)
+            if st == self._stats.get(p):
+                continue
+            self._stats[p] = st
+            digest = file_digest(p)
+            if digest != self._digests.get(p):
+                self._digests[p] = digest
+                changed.append(p)
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                changed = self.poll()
+                if changed:
+                    self.on_change(changed)
+            except Exception as e:
+                print("File watcher error:", e)
+
+    def start(self) -> "FileWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
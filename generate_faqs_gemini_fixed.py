@@ -2,16 +2,22 @@
 """
 Offline FAQ generator - creates a large FAQ file (data/faqs_large.json) from a small seed.
 This is deterministic-ish and safe for demos (no API calls).
+
+Load-test mode streams any number of synthetic FAQs to JSON Lines through a
+process pool instead (bounded memory, optional shards):
+    python generate_faqs_gemini_fixed.py --jsonl data/faqs_1m.jsonl --count 1000000 --workers 8 --shards 4
+Every chunk of records is generated from its own seed (--seed + chunk number),
+so the output does not depend on the number of workers.
 """
-import os, json, random, itertools
-random.seed(42)
+import os, sys, json, random, argparse, itertools
+from multiprocessing import Pool
+from faq_dedup import MinHashDeduper, size_report, format_report
+from faq_store import FaqWriter
 
 DATA_DIR = "data"
 OUT_PATH = os.path.join(DATA_DIR, "faqs_large.json")
 SEED_PATH = os.path.join(DATA_DIR, "faqs_large.json") if os.path.exists(os.path.join(DATA_DIR, "faqs_large.json")) else os.path.join(DATA_DIR, "faqs.json")
 
-os.makedirs(DATA_DIR, exist_ok=True)
-
 # default seed if none exists
 default_seed = [
   {"question":"How do I reset my password?", "answer":"Go to Settings → Account → Reset Password. You will receive a reset link on your registered email."},
@@ -20,17 +26,18 @@ default_seed = [
   {"question":"Who do I contact for payroll issues?", "answer":"Please email payroll@company.com with your employee ID and the payroll month in the subject line."}
 ]
 
-# load seed
-if os.path.exists(SEED_PATH):
-    try:
-        with open(SEED_PATH, "r", encoding="utf-8") as f:
-            seed = json.load(f)
-            if not isinstance(seed, list) or len(seed) == 0:
-                seed = default_seed
-    except Exception:
+def load_seed(path=SEED_PATH):
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                seed = json.load(f)
+                if not isinstance(seed, list) or len(seed) == 0:
+                    seed = default_seed
+        except Exception:
+            seed = default_seed
+    else:
         seed = default_seed
-else:
-    seed = default_seed
+    return seed
 
 # helper functions to create variations
 prefixes = ["How do I", "How can I", "Where can I", "What is the process to", "Can I", "Is it possible to", "How to"]
@@ -48,13 +55,11 @@ objects = ["password", "email", "profile", "bank details", "leave request", "ord
 topics = ["leave", "salary", "work from home", "reimbursement", "refund", "returns"]
 processes = ["refund processing", "order delivery", "account verification"]
 
-out = []
-# include seed
-for f in seed:
-    q = f.get("question","").strip()
-    a = f.get("answer","").strip()
-    if q and a:
-        out.append({"question": q, "answer": a})
+# extra context for load-test questions, so a large corpus isn't one template repeated
+departments = ["Finance", "HR", "Sales", "Engineering", "Support", "Operations", "Marketing", "Legal", "IT", "Procurement"]
+locations = ["Bangalore", "Pune", "Mumbai", "Delhi", "Chennai", "Hyderabad", "London", "Singapore", "remote", "head office"]
+timeframes = ["this month", "before payday", "during probation", "after a transfer", "while on leave",
+              "at year end", "in the notice period", "on a weekend"]
 
 # create paraphrases & template-based items
 def make_paraphrases(q, a):
@@ -72,31 +77,24 @@ def make_paraphrases(q, a):
     if "order" in qbase.lower():
         qs.add("Where is my order?")
         qs.add("Track my order status.")
-    return [{"question":qq, "answer":a} for qq in qs]
-
-# expand using seed paraphrases
-for f in seed:
-    out.extend(make_paraphrases(f["question"], f["answer"]))
+    return [{"question":qq, "answer":a} for qq in sorted(qs)]  # sorted: set order varies per process
 
-# generate synthetic ones until we reach ~1000 unique questions
-attempts = 0
-while len(out) < 1000 and attempts < 5000:
-    attempts += 1
-    t = random.choice(templates)
+def make_template_faq(rng):
+    t = rng.choice(templates)
     if "{object}" in t[0]:
-        action = random.choice(actions)
-        obj = random.choice(objects)
+        action = rng.choice(actions)
+        obj = rng.choice(objects)
         q = t[0].format(action=action, object=obj)
         a = t[1].format(action=action, object=obj)
     elif "{topic}" in t[0]:
-        top = random.choice(topics)
+        top = rng.choice(topics)
         q = t[0].format(topic=top)
         a = t[1].format(topic=top)
     else:
-        proc = random.choice(processes)
+        proc = rng.choice(processes)
         q = t[0].format(process=proc)
         a = t[1].format(process=proc)
-    out.append({"question": q, "answer": a})
+    return {"question": q, "answer": a}
 
 # add some shorter commons
 shorts = [
@@ -104,19 +102,150 @@ shorts = [
     ("How to change bank details?", "Go to Profile → Bank Details → Edit and submit supporting documents."),
     ("How do I get reimbursement?", "Upload bills in the Reimbursements section and submit for manager approval."),
 ]
-for q,a in shorts:
-    out.append({"question":q, "answer":a})
 
-# dedupe preserving first occurrence
-unique = {}
-for item in out:
-    key = item["question"].strip()
-    if key not in unique:
-        unique[key] = item
+def build_demo_faqs(seed):
+    random.seed(42)
+    out = []
+    # include seed
+    for f in seed:
+        q = f.get("question","").strip()
+        a = f.get("answer","").strip()
+        if q and a:
+            out.append({"question": q, "answer": a})
+
+    # expand using seed paraphrases
+    for f in seed:
+        out.extend(make_paraphrases(f["question"], f["answer"]))
+
+    # generate synthetic ones until we reach ~1000 unique questions
+    attempts = 0
+    while len(out) < 1000 and attempts < 5000:
+        attempts += 1
+        out.append(make_template_faq(random))
+
+    for q,a in shorts:
+        out.append({"question":q, "answer":a})
+
+    # dedupe preserving first occurrence
+    unique = {}
+    for item in out:
+        key = item["question"].strip()
+        if key not in unique:
+            unique[key] = item
+
+    # drop near-duplicate paraphrases ("How do I do I reset my password?") that share an answer
+    deduper = MinHashDeduper()
+    result = list(deduper.filter(unique.values()))[:1000]
+    return unique, result
 
-result = list(unique.values())[:1000]
+def write_demo():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    unique, result = build_demo_faqs(load_seed())
+
+    with open(OUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    print(f"Wrote {OUT_PATH} ({len(result)} FAQs).")
+    corpus_bytes = lambda items: sum(len(json.dumps(i, ensure_ascii=False).encode("utf-8")) for i in items)
+    print(format_report(size_report(len(unique), len(result), corpus_bytes(unique.values()), corpus_bytes(result))))
+
+# --- streaming load-test generation ----------------------------------------
+
+def make_load_test_faq(rng, seed_faqs):
+    """One synthetic FAQ: a seed paraphrase or template question with department / location / time context."""
+    if seed_faqs and rng.random() < 0.2:
+        f = rng.choice(seed_faqs)
+        base = rng.choice(make_paraphrases(f["question"], f["answer"]))
+    else:
+        base = make_template_faq(rng)
+    q = base["question"].rstrip("?.").strip()
+    dept, loc, when = rng.choice(departments), rng.choice(locations), rng.choice(timeframes)
+    question = f"{q} for {dept} staff in {loc} {when}{rng.choice(suffixes)}"
+    answer = f"{base['answer']} ({dept}, {loc})"
+    return {"question": question, "answer": answer}
+
+def generate_chunk(args):
+    """Worker: JSON lines for records [start, stop), seeded by the chunk number alone."""
+    chunk_no, start, stop, base_seed, seed_faqs = args
+    rng = random.Random(base_seed * 1_000_003 + chunk_no)
+    lines = []
+    for rid in range(start, stop):
+        faq = make_load_test_faq(rng, seed_faqs)
+        lines.append(json.dumps({"id": rid, **faq}, ensure_ascii=False))
+    return lines
+
+def shard_paths(path, shards):
+    if shards <= 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}-{i:05d}-of-{shards:05d}{ext or '.jsonl'}" for i in range(shards)]
+
+def generate_jsonl(path, count, workers=None, shards=1, chunk_size=10000, base_seed=42, dedupe=False):
+    """
+    Stream `count` FAQs to JSON Lines. Chunks are generated in a process pool
+    a window at a time (2 chunks per worker in flight), so memory stays at a
+    few chunks regardless of `count`. With shards > 1 each file gets a
+    contiguous range of chunks. dedupe=True runs the MinHash near-duplicate
+    filter while writing (its memory grows with the kept records), so fewer
+    than `count` records may be written.
+    """
+    workers = workers or os.cpu_count() or 1
+    seed_faqs = [f for f in load_seed() if f.get("question") and f.get("answer")]
+    n_chunks = (count + chunk_size - 1) // chunk_size
+    tasks = ((c, c * chunk_size, min(count, (c + 1) * chunk_size), base_seed, seed_faqs) for c in range(n_chunks))
+    paths = shard_paths(path, shards)
+    for p in paths:
+        os.makedirs(os.path.dirname(p) or ".", exist_ok=True)
+    deduper = MinHashDeduper() if dedupe else None
+    written = [0] * len(paths)
+    window = max(1, workers * 2)
+    writer = None
+    current = -1
+    try:
+        with Pool(workers) as pool:
+            for batch_start in range(0, n_chunks, window):
+                batch = list(itertools.islice(tasks, window))
+                for i, lines in enumerate(pool.imap(generate_chunk, batch)):
+                    shard = (batch_start + i) * len(paths) // n_chunks
+                    if shard != current:
+                        if writer is not None:
+                            writer.close()
+                        for skipped in range(current + 1, shard):
+                            FaqWriter(paths[skipped]).close()  # more shards than chunks: leave it empty
+                        writer, current = FaqWriter(paths[shard]), shard
+                    for line in lines:
+                        if deduper is not None and not deduper.keep(json.loads(line)):
+                            continue
+                        writer.write_line(line)
+                        written[shard] += 1
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.close()
+    for skipped in range(current + 1, len(paths)):
+        FaqWriter(paths[skipped]).close()
+    return list(zip(paths, written))
 
-with open(OUT_PATH, "w", encoding="utf-8") as f:
-    json.dump(result, f, indent=2, ensure_ascii=False)
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate FAQ files (demo JSON by default, or streamed JSONL).")
+    ap.add_argument("--jsonl", help="stream synthetic FAQs to this JSON Lines path instead of writing the demo file")
+    ap.add_argument("--count", type=int, default=1_000_000)
+    ap.add_argument("--workers", type=int, default=None, help="generator processes (default: CPU count)")
+    ap.add_argument("--shards", type=int, default=1)
+    ap.add_argument("--chunk-size", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--dedupe", action="store_true", help="drop near-duplicates while writing")
+    args = ap.parse_args(argv)
+    if not args.jsonl:
+        write_demo()
+        return
+    if args.count <= 0 or args.chunk_size <= 0 or args.shards <= 0:
+        sys.exit("--count, --chunk-size and --shards must be positive")
+    for path, n in generate_jsonl(args.jsonl, args.count, args.workers, args.shards, args.chunk_size,
+                                  args.seed, args.dedupe):
+        print(f"Wrote {path} ({n} FAQs).")
 
-print(f"Wrote {OUT_PATH} ({len(result)} FAQs).")
+if __name__ == "__main__":
+    main()
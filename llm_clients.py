@@ -0,0 +1,147 @@
+# llm_clients.py
+"""
+Long-lived LLM provider clients.
+
+- one pooled requests.Session per provider (keep-alive, LLM_POOL_SIZE
+  connections per host), so repeated calls reuse the TCP/TLS connection;
+- post_json() retries connection errors, 429 and 5xx responses with
+  jittered exponential backoff (honouring Retry-After), all within one
+  total timeout; read timeouts are not retried;
+- get_gemini_model() keeps one google-generativeai GenerativeModel per
+  model name instead of constructing one per request.
+
+Provider base URLs come from the environment so calls can be pointed at a
+local stub (benchmarks/stub_server.py).
+"""
+
+import os
+import time
+import random
+import threading
+from typing import Dict, Optional
+
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "10"))  # connections kept per provider host
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "0.25"))  # seconds, doubled per retry
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "4"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "15"))
+
+BASE_URLS = {
+    "groq": os.environ.get("GROQ_BASE_URL", "https://api.groq.com/openai/v1"),
+    "openai": os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+    "gemini": os.environ.get("GEMINI_REST_URL", "https://gemini.googleapis.com/v1/models/gemini"),
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_lock = threading.Lock()
+_sessions: Dict[str, object] = {}
+_gemini_models: Dict[str, object] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def base_url(provider: str) -> str:
+    return BASE_URLS[provider].rstrip("/")
+
+
+def get_session(provider: str):
+    """The shared requests.Session for `provider` (created on first use)."""
+    session = _sessions.get(provider)
+    if session is not None:
+        return session
+    import requests
+    from requests.adapters import HTTPAdapter
+    with _lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            # retries are done in post_json so they can back off with jitter
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=LLM_POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+    return session
+
+
+def _count(provider: str, key: str):
+    with _lock:
+        stats = _stats.setdefault(provider, {"requests": 0, "retries": 0, "errors": 0})
+        stats[key] += 1
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based), capped at LLM_BACKOFF_MAX."""
+    if retry_after:
+        try:
+            return min(LLM_BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def post_json(provider: str, url: str, payload: Dict, headers: Optional[Dict] = None,
+              timeout: float = LLM_TIMEOUT, max_retries: int = LLM_MAX_RETRIES) -> Dict:
+    """
+    POST `payload` as JSON through the provider's pooled session and return
+    the decoded JSON body. `timeout` is the total budget for the call: every
+    attempt's timeout and every backoff sleep is capped by the time left.
+    Connection failures, 429 and 5xx are retried up to `max_retries` times;
+    a read timeout is not (the generation request may already be running
+    upstream). The last error is raised.
+    """
+    import requests
+    session = get_session(provider)
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        _count(provider, "requests")
+        try:
+            resp = session.post(url, json=payload, headers=headers, timeout=max(0.01, deadline - time.monotonic()))
+            if resp.status_code in RETRY_STATUS and attempt < max_retries:
+                delay = backoff_delay(attempt, resp.headers.get("Retry-After"))
+                if delay >= deadline - time.monotonic():
+                    resp.raise_for_status()  # no time left for another attempt
+                resp.close()
+            else:
+                resp.raise_for_status()
+                return resp.json()
+        except requests.ReadTimeout:
+            _count(provider, "errors")
+            raise
+        except (requests.ConnectionError, requests.Timeout):
+            delay = backoff_delay(attempt)
+            if attempt >= max_retries or delay >= deadline - time.monotonic():
+                _count(provider, "errors")
+                raise
+        except Exception:
+            _count(provider, "errors")
+            raise
+        attempt += 1
+        _count(provider, "retries")
+        time.sleep(delay)
+
+
+def get_gemini_model(genai, model_name: str):
+    """One GenerativeModel per model name, reused across requests."""
+    model = _gemini_models.get(model_name)
+    if model is None:
+        with _lock:
+            model = _gemini_models.get(model_name)
+            if model is None:
+                model = genai.GenerativeModel(model_name)
+                _gemini_models[model_name] = model
+    return model
+
+
+def client_stats() -> Dict[str, Dict[str, int]]:
+    with _lock:
+        return {p: dict(s) for p, s in _stats.items()}
+
+
+def close_sessions():
+    """Close pooled connections (tests / shutdown); sessions are recreated on next use."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for s in sessions:
+        s.close()
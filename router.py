@@ -0,0 +1,107 @@
+# router.py
+"""
+Confidence-based routing for a user message.
+
+1. local:  the agent's FAQ index alone (exact match or a confident FAQ
+           hit, agent.local_answer) - no LLM call;
+2. online: get_online_answer, only for queries the FAQs can't answer
+           confidently (of those, queries naming a dataset record skip it,
+           the online providers don't have our data); called as
+           online(user_q, meta), and what it puts in meta (e.g. the
+           provider calls and hedges it cost) goes into the reply metadata;
+3. agent:  agent.handle_query (dataset lookup / Gemini with context), then
+           agent.generate_response / agent.answer;
+4. fallback reply.
+
+The metadata of every reply records the path taken ("route"), why
+("route_reason") and the milliseconds spent in each path tried
+("route_ms").
+"""
+
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+# extra floor on the FAQ score for a local answer (the retrieval mode's direct-answer threshold always applies)
+ROUTER_MIN_SCORE = float(os.environ.get("ROUTER_MIN_SCORE", "0"))
+
+FALLBACK_REPLY = "Sorry — I don't have an answer right now. Please contact support."
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def route_query(user_q: str, agent=None, online: Optional[Callable[[str, Dict], Optional[str]]] = None) -> Tuple[str, Dict]:
+    """Answer `user_q` through the cheapest confident path. Returns (text, metadata)."""
+    timings: Dict[str, float] = {}
+    local_meta: Dict = {}
+    online_meta: Dict = {}
+
+    def done(text, meta, route, reason):
+        meta = dict(meta)
+        meta["route"] = route
+        meta["route_reason"] = reason
+        meta["route_ms"] = timings
+        if "faq_score" in local_meta and "faq_score" not in meta:
+            meta["faq_score"] = local_meta["faq_score"]
+        for key in ("online_calls", "online_hedges"):
+            if key in online_meta:
+                meta[key] = online_meta[key]  # paid for even when another path answered
+        return text, meta
+
+    # 1) local FAQ answer
+    if ROUTER_ENABLED and agent is not None and hasattr(agent, "local_answer"):
+        t0 = time.perf_counter()
+        try:
+            text, local_meta = agent.local_answer(user_q, min_score=ROUTER_MIN_SCORE)
+        except Exception as e:
+            print("Local routing failed:", e)
+            text, local_meta = None, {}
+        timings["local"] = _ms(t0)
+        if text:
+            return done(text, local_meta, "local", "faq_confident")
+
+    # 2) online providers
+    record_query = bool(local_meta.get("record_query"))
+    if online and not record_query:
+        t0 = time.perf_counter()
+        try:
+            text = online(user_q, online_meta)
+        except Exception:
+            text = None
+        timings["online"] = _ms(t0)
+        if text:
+            return done(text, {**online_meta, "source": "online"}, "online", "faq_low_confidence" if ROUTER_ENABLED else "online_first")
+
+    reason = "record_query" if record_query else ("online_failed" if online else "no_online")
+    if agent:
+        # 3) agent.handle_query (may return (text, metadata))
+        t0 = time.perf_counter()
+        try:
+            if hasattr(agent, "handle_query"):
+                out = agent.handle_query(user_q)
+                timings["agent"] = _ms(t0)
+                if isinstance(out, tuple) and len(out) >= 1:
+                    return done(out[0], out[1] if len(out) > 1 else {}, "agent", reason)
+                return done(str(out), {}, "agent", reason)
+        except Exception:
+            # swallow and try other ways
+            pass
+
+        # try generate_response / answer
+        try:
+            if hasattr(agent, "generate_response"):
+                txt = agent.generate_response(user_q)
+                timings["agent"] = _ms(t0)
+                return done(txt, {"source": "agent.generate_response"}, "agent", reason)
+            if hasattr(agent, "answer"):
+                txt = agent.answer(user_q)
+                timings["agent"] = _ms(t0)
+                return done(txt, {"source": "agent.answer"}, "agent", reason)
+        except Exception:
+            pass
+
+    # 4) final fallback
+    return done(FALLBACK_REPLY, {"source": "fallback"}, "fallback", reason)
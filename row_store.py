@@ -0,0 +1,271 @@
+# row_store.py
+"""
+Columnar, memory-compact store for the dataset CSV.
+
+Instead of one dict per row (plus a key string per cell), every column is
+stored once for all rows:
+
+- dictionary-encoded columns (ROW_DICT_COLUMNS: ids, names, departments,
+  record types, dates) keep each distinct value once plus an array of
+  4-byte codes;
+- other columns (free-text notes) are one UTF-8 blob plus an offset array.
+
+Columns in ROW_INDEXED_COLUMNS (employee_id, record_type, date) also get a
+value -> row ids index (for the ROW_PRIMARY_KEY column, employee_id, this is
+the primary-key index: one employee can own several records), so a query naming an employee, a record type or a
+date ("payroll records for E004") resolves by direct lookup instead of a
+text search. Rows are exposed as read-only Mapping views and the store is a
+Sequence, so code written for a list of dicts keeps working.
+"""
+
+import os
+import re
+import csv
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ROW_DICT_COLUMNS = tuple(c.strip() for c in os.environ.get(
+    "ROW_DICT_COLUMNS", "employee_id,name,department,record_type,date").split(",") if c.strip())
+ROW_INDEXED_COLUMNS = tuple(c.strip() for c in os.environ.get(
+    "ROW_INDEXED_COLUMNS", "employee_id,record_type,date").split(",") if c.strip())
+ROW_PRIMARY_KEY = os.environ.get("ROW_PRIMARY_KEY", "employee_id")
+
+_QUERY_TOKEN_RE = re.compile(r"[\w-]+")
+KEY_SHAPE_SAMPLE = 1000  # distinct primary key values whose shapes mark ids in query text
+
+
+def _shape(token: str) -> str:
+    return re.sub(r"\d", "9", re.sub(r"[^\W\d_]", "a", token.lower()))
+
+
+class _DictColumn:
+    """Each distinct value stored once; rows hold 4-byte codes."""
+
+    __slots__ = ("values", "codes", "_code_of", "folded")
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self.codes = array("I")
+        self._code_of: Dict[Optional[str], int] = {}
+        # lower-cased value -> code (first spelling wins), for matching query text
+        self.folded: Dict[str, int] = {}
+
+    def append(self, value: Optional[str]) -> int:
+        code = self._code_of.get(value)
+        if code is None:
+            code = len(self.values)
+            self._code_of[value] = code
+            self.values.append(value)
+            if value:
+                self.folded.setdefault(value.lower(), code)
+        self.codes.append(code)
+        return code
+
+    def get(self, i: int) -> Optional[str]:
+        return self.values[self.codes[i]]
+
+    def code(self, value: Optional[str]) -> Optional[int]:
+        return self._code_of.get(value)
+
+
+class _TextColumn:
+    """All values in one UTF-8 blob; row i is blob[offsets[i]:offsets[i + 1]]."""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self):
+        self.blob = bytearray()
+        self.offsets = array("Q", [0])
+
+    def append(self, value: Optional[str]):
+        if value:
+            self.blob += value.encode("utf-8")
+        self.offsets.append(len(self.blob))
+
+    def get(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+
+class Row(Mapping):
+    """Read-only view of one stored row; values are decoded on access."""
+
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: "RowStore", i: int):
+        self._store = store
+        self._i = i
+
+    def __getitem__(self, key):
+        col = self._store._columns.get(key)
+        if col is None:
+            raise KeyError(key)
+        return col.get(self._i)
+
+    def __iter__(self):
+        return iter(self._store.columns)
+
+    def __len__(self):
+        return len(self._store.columns)
+
+    @property
+    def row_id(self) -> int:
+        return self._i
+
+    def __repr__(self):
+        return f"Row({dict(self)!r})"
+
+
+class RowStore(Sequence):
+    def __init__(self, columns: List[str], dict_columns: Iterable[str] = ROW_DICT_COLUMNS,
+                 indexed_columns: Iterable[str] = ROW_INDEXED_COLUMNS, primary_key: Optional[str] = ROW_PRIMARY_KEY):
+        self.columns = list(columns)
+        self.primary_key = primary_key if primary_key in self.columns else None
+        indexed_columns = list(indexed_columns) + ([self.primary_key] if self.primary_key else [])
+        dict_columns = set(dict_columns) | set(indexed_columns)
+        self._columns = {c: (_DictColumn() if c in dict_columns else _TextColumn()) for c in self.columns}
+        # column -> code -> row ids
+        self._indexes: Dict[str, Dict[int, array]] = {c: {} for c in indexed_columns if c in self._columns}
+        self._appenders = [self._columns[c] for c in self.columns]
+        self._index_of = [self._indexes.get(c) for c in self.columns]
+        self._n = 0
+        # shapes of the first KEY_SHAPE_SAMPLE primary key values, and how many of them it covers
+        self._pk_shapes: set = set()
+        self._pk_shapes_seen = 0
+
+    @classmethod
+    def from_csv(cls, path: str, **kwargs) -> "RowStore":
+        """Stream a CSV file (header row first) into a store."""
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            store = cls(header or [], **kwargs)
+            width = len(store.columns)
+            for values in reader:
+                if len(values) < width:
+                    values = values + [None] * (width - len(values))  # like DictReader's restval
+                store.append(values[:width])
+        return store
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict], **kwargs) -> "RowStore":
+        rows = iter(rows)
+        first = next(rows, None)
+        store = cls(list(first) if first is not None else [], **kwargs)
+        if first is not None:
+            store.append([first.get(c) for c in store.columns])
+            for r in rows:
+                store.append([r.get(c) for c in store.columns])
+        return store
+
+    def append(self, values: List[Optional[str]]):
+        i = self._n
+        for col, index, value in zip(self._appenders, self._index_of, values):
+            code = col.append(value)
+            if index is not None:
+                postings = index.get(code)
+                if postings is None:
+                    postings = index[code] = array("I")
+                postings.append(i)
+        self._n += 1
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [Row(self, j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("row index out of range")
+        return Row(self, i)
+
+    # --- indexed lookups ----------------------------------------------------
+
+    def lookup(self, column: str, value: str) -> array:
+        """Row ids whose `column` equals `value` (column must be indexed)."""
+        col = self._columns[column]
+        code = col.code(value)
+        if code is None:
+            return array("I")
+        return self._indexes[column].get(code, array("I"))
+
+    def select(self, **filters: str) -> List[int]:
+        """Row ids matching every column=value filter, in row order."""
+        if not filters:
+            return []
+        # walk the shortest posting list and check the other columns' codes row by row
+        column, value = min(filters.items(), key=lambda kv: len(self.lookup(*kv)))
+        checks = []
+        for other, other_value in filters.items():
+            if other == column:
+                continue
+            code = self._columns[other].code(other_value)
+            if code is None:
+                return []
+            checks.append((self._columns[other].codes, code))
+        return [i for i in self.lookup(column, value) if all(codes[i] == code for codes, code in checks)]
+
+    def query_filters(self, text: str) -> Dict[str, str]:
+        """
+        Indexed column values named in free text, matched case-insensitively
+        as whole tokens ("payroll records for E004" -> record_type=payroll,
+        employee_id=E004). A plural token also matches its singular value.
+        A token shaped like a primary key ("E009") that is not in the store
+        still becomes a filter, so the lookup finds nothing rather than other
+        employees' rows.
+        """
+        tokens = []
+        for t in _QUERY_TOKEN_RE.findall((text or "").lower()):
+            tokens.append(t)
+            if t.endswith("s") and len(t) > 3:
+                tokens.append(t[:-1])
+        filters = {}
+        for column in self._indexes:
+            col = self._columns[column]
+            for t in tokens:
+                code = col.folded.get(t)
+                if code is not None:
+                    filters[column] = col.values[code]
+                    break
+        pk = self.primary_key
+        if pk is not None and pk not in filters:
+            shapes = self._key_shapes()
+            for t in tokens:
+                if _shape(t) in shapes:
+                    filters[pk] = t.upper()
+                    break
+        return filters
+
+    def _key_shapes(self) -> set:
+        # the shapes of a sample of keys ("E001" -> "a999") are enough to recognise ids in text;
+        # only key values added since the last call are shaped
+        values = self._columns[self.primary_key].values
+        if self._pk_shapes_seen < min(len(values), KEY_SHAPE_SAMPLE):
+            new = values[self._pk_shapes_seen:KEY_SHAPE_SAMPLE]
+            self._pk_shapes.update(_shape(v) for v in new if v)
+            self._pk_shapes_seen += len(new)
+        return self._pk_shapes
+
+    def lookup_query(self, text: str, limit: int = 3) -> Tuple[Dict[str, str], List[Row]]:
+        """
+        (filters found in `text`, matching rows) via the indexes. Rows are
+        only returned when the filters name a primary key or narrow the
+        result to at most `limit` rows; a bare "payroll" matches too broadly
+        to stand for an answer.
+        """
+        filters = self.query_filters(text)
+        if not filters:
+            return filters, []
+        ids = self.select(**filters)
+        if self.primary_key not in filters and len(ids) > limit:
+            return filters, []
+        return filters, [Row(self, i) for i in ids[:limit]]
+
+    def stats(self) -> Dict:
+        return {
+            "rows": self._n,
+            "columns": {c: (len(col.values) if isinstance(col, _DictColumn) else "text")
+                        for c, col in self._columns.items()},
+        }
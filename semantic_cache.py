@@ -0,0 +1,259 @@
+# semantic_cache.py
+"""
+Semantic cache for generated answers (Gemini in support_agent, the online
+providers in agent_online), persisted in SQLite.
+
+An entry is keyed by
+- a namespace ("gemini", "online"),
+- a hash of the retrieved context the answer was generated from, plus the
+  query's tokens that contain digits (ids, dates, amounts: "E001" and
+  "E002" must never share an answer),
+- the embedder that produced its query vector.
+With a dense sentence encoder (the FAQ model, passed by the caller) a new
+query hits when its vector is within SEMANTIC_CACHE_MAX_DISTANCE cosine
+distance of a cached query with the same key. Without one, only the same
+normalized query (case, punctuation and spacing ignored) hits: a lexical
+vector can't tell "maternity leave" from "paternity leave".
+
+Entries older than SEMANTIC_CACHE_TTL are ignored and purged; beyond
+SEMANTIC_CACHE_MAX_ENTRIES the least recently used are evicted. stats()
+reports the hit rate and the (estimated) tokens saved. numpy is only
+imported for the dense path.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+SEMANTIC_CACHE = os.environ.get("SEMANTIC_CACHE", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_PATH = os.environ.get("SEMANTIC_CACHE_PATH", os.path.join("data", ".llm_cache", "answers.sqlite3"))
+SEMANTIC_CACHE_MAX_DISTANCE = float(os.environ.get("SEMANTIC_CACHE_MAX_DISTANCE", "0.05"))  # 1 - cosine similarity
+SEMANTIC_CACHE_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", str(24 * 3600)))  # seconds
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+EXACT = "exact"  # embedder name of entries matched by normalized query text only
+
+_WORD_RE = re.compile(r"\w+")
+
+# (name, encode(list of texts) -> 2-D array); the name keeps vectors of different models apart
+Embedder = Tuple[str, Callable[[List[str]], "np.ndarray"]]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(_WORD_RE.findall((query or "").lower()))
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return sum(len(t or "") for t in texts) // 4 + 1
+
+
+def context_key(query: str, context: str = "") -> str:
+    digits = sorted({t for t in _WORD_RE.findall((query or "").lower()) if any(c.isdigit() for c in t)})
+    h = hashlib.sha1((context or "").encode("utf-8"))
+    h.update(b"\0" + " ".join(digits).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _unit_vector(embedder: Embedder, query: str):
+    import numpy as np
+    vector = np.asarray(embedder[1]([query]), dtype=np.float32)[0]
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    def __init__(self, path: str = SEMANTIC_CACHE_PATH, max_distance: float = SEMANTIC_CACHE_MAX_DISTANCE,
+                 ttl: float = SEMANTIC_CACHE_TTL, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, ctx TEXT NOT NULL, embedder TEXT NOT NULL,"
+            " vector BLOB NOT NULL, query TEXT NOT NULL, answer TEXT NOT NULL, tokens INTEGER NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0,"
+            " norm_query TEXT NOT NULL DEFAULT '')")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(answers)")}
+        if "norm_query" not in columns:  # cache files written before exact matching
+            self._db.execute("ALTER TABLE answers ADD COLUMN norm_query TEXT NOT NULL DEFAULT ''")
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_key ON answers (namespace, ctx, embedder)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_exact ON answers (namespace, ctx, norm_query)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_query ON answers (namespace, norm_query)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_lru ON answers (last_used)")
+        self._db.commit()
+        # (namespace, ctx, embedder) -> (row ids, vector matrix), loaded from the db on first use
+        self._groups: Dict[Tuple[str, str, str], tuple] = {}
+        self.lookups = 0
+        self.hits = 0
+        self.tokens_saved = 0
+        self.evictions = 0
+        self.purge_expired()
+
+    def _group(self, key: Tuple[str, str, str]) -> tuple:
+        import numpy as np
+        group = self._groups.get(key)
+        if group is None:
+            rows = self._db.execute(
+                "SELECT id, vector FROM answers WHERE namespace = ? AND ctx = ? AND embedder = ? AND created > ?",
+                (*key, time.time() - self.ttl)).fetchall()
+            ids = [r[0] for r in rows]
+            vectors = (np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+                       if rows else np.zeros((0, 0), dtype=np.float32))
+            group = self._groups[key] = (ids, vectors)
+        return group
+
+    def _nearest(self, key: Tuple[str, str, str], vector) -> Optional[int]:
+        ids, vectors = self._group(key)
+        if not ids or vectors.shape[1] != vector.shape[0]:
+            return None
+        sims = vectors @ vector
+        best = int(sims.argmax())
+        if 1.0 - float(sims[best]) > self.max_distance:
+            return None
+        return ids[best]
+
+    def get(self, namespace: str, query: str, context: str = "",
+            embedder: Optional[Embedder] = None) -> Optional[str]:
+        """
+        Cached answer for the same context and a query near `query` (dense
+        `embedder`) or equal to it after normalization (no embedder), or None.
+        """
+        ctx = context_key(query, context)
+        vector = _unit_vector(embedder, query) if embedder is not None else None
+        with self._lock:
+            self.lookups += 1
+            if vector is not None:
+                key = (namespace, ctx, embedder[0])
+                entry_id = self._nearest(key, vector)
+                if entry_id is None:
+                    return None
+                row = self._db.execute("SELECT id, answer, tokens, created FROM answers WHERE id = ?",
+                                       (entry_id,)).fetchone()
+            else:
+                key = None
+                row = self._db.execute(
+                    "SELECT id, answer, tokens, created FROM answers WHERE namespace = ? AND ctx = ?"
+                    " AND embedder = ? AND norm_query = ? ORDER BY created DESC LIMIT 1",
+                    (namespace, ctx, EXACT, normalize_query(query))).fetchone()
+            if row is None or time.time() - row[3] > self.ttl:
+                if key is not None:
+                    self._groups.pop(key, None)  # evicted or expired since the group was loaded
+                return None
+            self._db.execute("UPDATE answers SET last_used = ?, hits = hits + 1 WHERE id = ?", (time.time(), row[0]))
+            self._db.commit()
+            self.hits += 1
+            self.tokens_saved += row[2]
+            return row[1]
+
+    def seen(self, namespace: str, query: str) -> bool:
+        """
+        Whether a live entry exists for the same normalized query, under any
+        context: a cheap hint, before the context is known, that get() is
+        likely to hit. Not counted as a lookup.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM answers WHERE namespace = ? AND norm_query = ? AND created > ? LIMIT 1",
+                (namespace, normalize_query(query), time.time() - self.ttl)).fetchone()
+        return row is not None
+
+    def put(self, namespace: str, query: str, answer: str, context: str = "",
+            embedder: Optional[Embedder] = None, tokens: Optional[int] = None):
+        """Store `answer`; `tokens` is what regenerating it would cost (estimated from the text if omitted)."""
+        if not answer:
+            return
+        vector = _unit_vector(embedder, query) if embedder is not None else None
+        key = (namespace, context_key(query, context), embedder[0] if embedder is not None else EXACT)
+        if tokens is None:
+            tokens = estimate_tokens(context, query, answer)
+        now = time.time()
+        blob = vector.astype("float32").tobytes() if vector is not None else b""
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO answers (namespace, ctx, embedder, vector, query, answer, tokens, created, last_used,"
+                " norm_query) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, blob, query, answer, int(tokens), now, now, normalize_query(query)))
+            group = self._groups.get(key)
+            if group is not None and vector is not None:
+                import numpy as np
+                ids, vectors = group
+                vectors = vector[None, :] if not ids else np.vstack([vectors, vector[None, :]])
+                self._groups[key] = (ids + [cur.lastrowid], vectors)
+            self._evict_lru()
+            self._db.commit()
+
+    def _evict_lru(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_used LIMIT ?)", (excess,))
+            self.evictions += excess
+            self._groups.clear()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._db.execute("DELETE FROM answers WHERE created <= ?", (time.time() - self.ttl,))
+            self._db.commit()
+            if cur.rowcount:
+                self.evictions += cur.rowcount
+                self._groups.clear()
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
+            self._groups.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()
+            return {
+                "entries": entries,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": (self.hits / self.lookups) if self.lookups else 0.0,
+                "tokens_saved": self.tokens_saved,
+                "evictions": self.evictions,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_MISSING = object()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[SemanticCache]:
+    """The process-wide cache at SEMANTIC_CACHE_PATH, or None when disabled or unusable."""
+    global _cache
+    if not SEMANTIC_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = SemanticCache()
+                except Exception as e:
+                    print("Semantic cache unavailable:", e)
+                    _cache = _MISSING
+    return None if _cache is _MISSING else _cache
+
+
+def cache_stats() -> Dict:
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -0,0 +1,107 @@
+# speculation.py
+"""
+Bounded speculative execution for slow calls (the Gemini request in
+support_agent.generate_response).
+
+A speculative call is started before we know whether it is needed, so it
+overlaps with retrieval; afterwards the caller either use()s its result or
+discard()s it. The extra spend is capped two ways:
+
+- at most SPECULATION_MAX_INFLIGHT speculative calls run at once;
+- speculation only starts while, over the last SPECULATION_WINDOW queries,
+  at least SPECULATION_MIN_NEED_RATE of them actually needed the call
+  (every query reports that through note_outcome(), speculated or not, so
+  the gate re-opens on its own when the traffic mix changes).
+"""
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Optional
+
+SPECULATION_MAX_INFLIGHT = int(os.environ.get("SPECULATION_MAX_INFLIGHT", "4"))
+SPECULATION_MIN_NEED_RATE = float(os.environ.get("SPECULATION_MIN_NEED_RATE", "0.3"))
+SPECULATION_WINDOW = int(os.environ.get("SPECULATION_WINDOW", "50"))
+
+
+class Speculator:
+    def __init__(self, max_inflight: int = SPECULATION_MAX_INFLIGHT,
+                 min_need_rate: float = SPECULATION_MIN_NEED_RATE, window: int = SPECULATION_WINDOW):
+        self.max_inflight = max_inflight
+        self.min_need_rate = min_need_rate
+        self._needed = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.counts = {"started": 0, "used": 0, "wasted": 0, "cancelled": 0,
+                       "skipped_inflight": 0, "skipped_need_rate": 0}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=max(1, self.max_inflight),
+                                                        thread_name_prefix="speculate")
+        return self._executor
+
+    def need_rate(self) -> float:
+        with self._lock:
+            return (sum(self._needed) / len(self._needed)) if self._needed else 1.0
+
+    def start(self, fn, *args, **kwargs) -> Optional[Future]:
+        """Submit fn speculatively, or return None when over budget."""
+        if self.need_rate() < self.min_need_rate:
+            with self._lock:
+                self.counts["skipped_need_rate"] += 1
+            return None
+        with self._lock:
+            if self._inflight >= self.max_inflight:
+                self.counts["skipped_inflight"] += 1
+                return None
+            self._inflight += 1
+            self.counts["started"] += 1
+        fut = self._pool().submit(fn, *args, **kwargs)
+        fut.add_done_callback(self._finished)
+        return fut
+
+    def skip(self, reason: str):
+        """Count a speculation the caller decided against (e.g. the answer is likely local)."""
+        with self._lock:
+            key = "skipped_" + reason
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _finished(self, fut: Future):
+        with self._lock:
+            self._inflight -= 1
+
+    def note_outcome(self, needed: bool):
+        """Whether the current query turned out to need the call."""
+        with self._lock:
+            self._needed.append(1 if needed else 0)
+
+    def use(self, fut: Future, timeout: Optional[float] = None):
+        """The speculative result (waits for it); raises like the call would."""
+        try:
+            result = fut.result(timeout=timeout)
+        except FutureTimeout:
+            self.discard(fut)
+            raise
+        with self._lock:
+            self.counts["used"] += 1
+        return result
+
+    def discard(self, fut: Future):
+        """Drop an unneeded speculation; cancelled if it has not started yet."""
+        cancelled = fut.cancel()
+        with self._lock:
+            self.counts["cancelled" if cancelled else "wasted"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counts)
+            stats["inflight"] = self._inflight
+            stats["need_rate"] = (sum(self._needed) / len(self._needed)) if self._needed else 1.0
+        done = stats["used"] + stats["wasted"]
+        stats["wasted_rate"] = (stats["wasted"] / done) if done else 0.0
+        return stats
@@ -0,0 +1,283 @@
+# vector_index.py
+"""
+FAISS index construction for the FAQ embeddings.
+
+Index types (FAQ_INDEX_TYPE):
+    flat   exact inner-product scan (IndexFlatIP)
+    hnsw   graph-based ANN (IndexHNSWFlat)
+    ivf    inverted lists over k-means cells, full vectors (IndexIVFFlat)
+    ivfpq  inverted lists with product-quantized vectors (IndexIVFPQ)
+    auto   flat below ANN_THRESHOLD vectors, ANN_AUTO_TYPE above it
+
+Vector storage (FAQ_INDEX_STORAGE) for flat / hnsw / ivf:
+    float32  full vectors (4 bytes per dim)
+    float16  half-precision scalar quantizer (2 bytes per dim)
+    int8     8-bit scalar quantizer (1 byte per dim)
+    pq       product quantization (d/8 bytes per vector with 8-bit codes)
+With FAQ_RESCORE the top candidates from a quantized index are re-scored
+against the float32 vectors in the memory-mapped embedding cache.
+
+All indexes hold L2-normalized vectors and score by inner product (cosine).
+Labels are FAQ ids. Trained indexes can be written to disk keyed by a
+signature of their inputs so the next start skips training.
+"""
+
+import os
+import math
+import hashlib
+from typing import Iterable, Optional
+
+import numpy as np
+import faiss
+
+INDEX_TYPE = os.environ.get("FAQ_INDEX_TYPE", "auto").lower()
+ANN_THRESHOLD = int(os.environ.get("ANN_THRESHOLD", "50000"))
+ANN_AUTO_TYPE = os.environ.get("ANN_AUTO_TYPE", "hnsw").lower()
+HNSW_M = int(os.environ.get("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "16"))
+PQ_NBITS = 8  # upper bound; small corpora get fewer bits (see pq_nbits)
+INDEX_STORAGE = os.environ.get("FAQ_INDEX_STORAGE", "float32").lower()
+# "auto" re-scores whenever the index stores lossy vectors
+RESCORE = os.environ.get("FAQ_RESCORE", "auto").lower()
+RESCORE_FACTOR = int(os.environ.get("FAQ_RESCORE_FACTOR", "4"))  # candidates fetched per requested result
+
+ANN_TYPES = ("hnsw", "ivf", "ivfpq")
+INDEX_TYPES = ("flat",) + ANN_TYPES
+STORAGE_MODES = ("float32", "float16", "int8", "pq")
+
+# ids are stored in the low 32 bits of a label; the high bits carry a
+# generation for indexes that cannot remove vectors (see label_for)
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+
+def label_for(faq_id: int, generation: int = 0) -> int:
+    return (generation << ID_BITS) | faq_id
+
+
+def split_label(label: int):
+    return label & ID_MASK, label >> ID_BITS
+
+
+def choose_index_type(n: int, requested: str = INDEX_TYPE) -> str:
+    requested = (requested or "auto").lower()
+    if requested == "auto":
+        return ANN_AUTO_TYPE if n >= ANN_THRESHOLD else "flat"
+    if requested not in INDEX_TYPES:
+        print(f"Unknown FAQ_INDEX_TYPE {requested!r}; using flat.")
+        return "flat"
+    return requested
+
+
+def ivf_nlist(n: int) -> int:
+    """Number of IVF cells: ~4*sqrt(n), keeping >= 39 training points per cell."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def pq_subquantizers(d: int) -> int:
+    """Largest divisor of d that gives sub-vectors of at least 8 dims (e.g. 48 for 384)."""
+    for m in range(d // 8, 0, -1):
+        if d % m == 0:
+            return m
+    return 1
+
+
+def pq_nbits(n: int) -> int:
+    """Bits per PQ code, so each codebook gets ~39 training points per centroid (0 = too few to train)."""
+    bits = int(math.log2(max(n // 39, 1)))
+    return min(PQ_NBITS, bits) if bits >= 4 else 0
+
+
+def choose_storage(requested: str = INDEX_STORAGE) -> str:
+    requested = (requested or "float32").lower()
+    if requested not in STORAGE_MODES:
+        print(f"Unknown FAQ_INDEX_STORAGE {requested!r}; using float32.")
+        return "float32"
+    return requested
+
+
+def is_lossy(index_type: str, storage: str) -> bool:
+    return storage != "float32" or index_type == "ivfpq"
+
+
+def rescore_enabled(index_type: str, storage: str, requested: str = RESCORE) -> bool:
+    if requested == "auto":
+        return is_lossy(index_type, storage)
+    return requested in ("1", "true", "yes")
+
+
+def _sq_type(storage: str):
+    return faiss.ScalarQuantizer.QT_fp16 if storage == "float16" else faiss.ScalarQuantizer.QT_8bit
+
+
+def supports_remove(index) -> bool:
+    """HNSW graphs cannot drop vectors; updates there are handled with label generations."""
+    return not isinstance(faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index,
+                          faiss.IndexHNSW)
+
+
+def _new_index(index_type: str, d: int, n: int, storage: str = "float32"):
+    ip = faiss.METRIC_INNER_PRODUCT
+    if index_type == "hnsw":
+        if storage == "float32":
+            base = faiss.IndexHNSWFlat(d, HNSW_M, ip)
+        elif storage == "pq":
+            base = faiss.IndexHNSWPQ(d, pq_subquantizers(d), HNSW_M, pq_nbits(n), ip)
+        else:
+            base = faiss.IndexHNSWSQ(d, _sq_type(storage), HNSW_M, ip)
+        base.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        base.hnsw.efSearch = HNSW_EF_SEARCH
+        # HNSW has no add_with_ids; the id map provides the labels
+        return faiss.IndexIDMap2(base)
+    if index_type in ("ivf", "ivfpq"):
+        nlist = ivf_nlist(n)
+        quantizer = faiss.IndexFlatIP(d)
+        if index_type == "ivfpq" or storage == "pq":
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_subquantizers(d), pq_nbits(n), ip)
+        elif storage == "float32":
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, ip)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, d, nlist, _sq_type(storage), ip)
+        index.nprobe = min(IVF_NPROBE, nlist)
+        # keep the quantizer alive as long as the index (SWIG ownership)
+        index.own_fields = True
+        quantizer.this.disown()
+        return index
+    if storage == "pq":
+        return faiss.IndexIDMap2(faiss.IndexPQ(d, pq_subquantizers(d), pq_nbits(n), ip))
+    if storage in ("float16", "int8"):
+        return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(d, _sq_type(storage), ip))
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(d))
+
+
+def build_vector_index(vectors: np.ndarray, ids: Iterable[int], index_type: str = "flat",
+                       storage: str = "float32"):
+    """Build (and train, if needed) an index of `index_type` / `storage` over normalized `vectors`."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    labels = np.ascontiguousarray(np.fromiter(ids, dtype=np.int64, count=len(vectors)))
+    n, d = vectors.shape
+    if (index_type == "ivfpq" or storage == "pq") and pq_nbits(n) == 0:
+        # too few vectors to train PQ codebooks
+        index_type = "ivf" if index_type == "ivfpq" else index_type
+        storage = "int8"
+    if index_type in ("ivf", "ivfpq") and ivf_nlist(n) < 2:
+        index_type = "flat"
+    index = _new_index(index_type, d, n, storage)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, labels)
+    return index
+
+
+def index_signature(keys: Iterable[str], ids: Iterable[int], index_type: str, storage: str = "float32") -> str:
+    """Hash of everything that determines a trained index: vector keys, ids, type and parameters."""
+    h = hashlib.sha1()
+    h.update(f"{index_type}|{storage}|{HNSW_M}|{HNSW_EF_CONSTRUCTION}|{PQ_NBITS}\n".encode("utf-8"))
+    for k, i in zip(keys, ids):
+        h.update(f"{k}:{i}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_or_build(vectors: np.ndarray, ids, index_type: str, keys=None, cache_dir: Optional[str] = None,
+                  storage: str = "float32"):
+    """
+    Trained indexes (ANN types, int8 and PQ storage) are persisted under
+    cache_dir as <type>-<signature>.faiss and reloaded when the inputs are
+    unchanged; untrained flat indexes are always rebuilt (building them
+    costs no more than reading them back).
+    """
+    path = None
+    if cache_dir and keys is not None and (index_type in ANN_TYPES or storage in ("int8", "pq")):
+        sig = index_signature(keys, ids, index_type, storage)
+        path = os.path.join(cache_dir, f"{index_type}-{sig}.faiss")
+        if os.path.exists(path):
+            try:
+                index = faiss.read_index(path)
+                set_search_params(index)
+                return index
+            except Exception as e:
+                print("Could not read saved ANN index; rebuilding:", e)
+    index = build_vector_index(vectors, ids, index_type, storage)
+    if path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            for old in os.listdir(cache_dir):
+                if old.startswith(index_type + "-") and old.endswith(".faiss"):
+                    os.remove(os.path.join(cache_dir, old))
+            tmp = path + ".tmp"
+            faiss.write_index(index, tmp)
+            os.replace(tmp, path)
+        except Exception as e:
+            print("Could not save ANN index:", e)
+    return index
+
+
+def set_search_params(index, ef_search: int = HNSW_EF_SEARCH, nprobe: int = IVF_NPROBE):
+    """Search-time knobs are not stored in the index file; re-apply them after loading."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = min(nprobe, inner.nlist)
+
+
+class RescoreStore:
+    """
+    float32 vectors for re-scoring quantized search results, looked up by
+    FAQ id. `vectors` is normally the embedding cache's memory-mapped .npy,
+    so only candidate rows are paged in; vectors added by incremental edits
+    live in the small `extra` dict and take precedence.
+    """
+
+    def __init__(self, vectors: np.ndarray, fids: np.ndarray, rows: np.ndarray, extra=None):
+        fids = np.asarray(fids, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        valid = rows >= 0
+        fids, rows = fids[valid], rows[valid]
+        order = np.argsort(fids, kind="stable")
+        self.vectors = vectors
+        self._fids = fids[order]
+        self._rows = rows[order]
+        self.extra = extra or {}
+
+    def with_vector(self, fid: int, vec: np.ndarray) -> "RescoreStore":
+        """Copy sharing the base matrix, with one extra vector (stores are immutable like snapshots)."""
+        clone = RescoreStore.__new__(RescoreStore)
+        clone.vectors, clone._fids, clone._rows = self.vectors, self._fids, self._rows
+        clone.extra = dict(self.extra)
+        clone.extra[fid] = np.asarray(vec, dtype=np.float32).ravel()
+        return clone
+
+    def get(self, fids) -> np.ndarray:
+        """Normalized float32 vectors for `fids` (zeros for unknown ids)."""
+        fids = np.asarray(fids, dtype=np.int64)
+        out = np.zeros((len(fids), self.vectors.shape[1]), dtype=np.float32)
+        pos = np.searchsorted(self._fids, fids)
+        pos_ok = pos < len(self._fids)
+        found = np.zeros(len(fids), dtype=bool)
+        found[pos_ok] = self._fids[pos[pos_ok]] == fids[pos_ok]
+        if found.any():
+            rows = self._rows[pos[found]]
+            order = np.argsort(rows)  # sorted reads are kinder to the page cache
+            block = np.asarray(self.vectors[rows[order]], dtype=np.float32)
+            tmp = np.empty_like(block)
+            tmp[order] = block
+            out[found] = tmp
+        for i, fid in enumerate(fids.tolist()):
+            vec = self.extra.get(fid)
+            if vec is not None:
+                out[i] = vec
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+def rescore(store: RescoreStore, query: np.ndarray, fids, k: int):
+    """Exact cosine re-ranking of candidate `fids` for one normalized query -> [(score, fid)]."""
+    if len(fids) == 0:
+        return []
+    scores = store.get(fids) @ np.asarray(query, dtype=np.float32).ravel()
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [(float(scores[i]), int(fids[i])) for i in order]